@@ -13,13 +13,75 @@ if hasattr(os, 'tzset'):
 TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_USER_ID = int(os.getenv("ADMIN_USER_ID", 0))
 URL_PAGE = "https://hoe.com.ua/page/pogodinni-vidkljuchennja"
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook
+
+# Webhook settings (BOT_MODE=webhook)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public URL registered in Telegram; empty - don't register (local testing)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # checked against X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_MAX_CONCURRENT = int(os.getenv("WEBHOOK_MAX_CONCURRENT", 20))  # updates handled at once
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", 500))  # queued updates before answering 503 (Telegram retries)
+WEBHOOK_SHUTDOWN_TIMEOUT = float(os.getenv("WEBHOOK_SHUTDOWN_TIMEOUT", 30))  # seconds to finish accepted updates on stop
 
 # Database settings
 DATABASE_PATH = os.getenv("DATABASE_PATH", "users.db")
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", 4))  # threads serving reads; writes go through one writer thread
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", 30))  # seconds
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 64 * 1024 * 1024))  # bytes
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))  # prepared statements per connection
 
 # Cache settings
 CACHE_PATH = os.getenv("CACHE_PATH", "cache/cached_schedules.json")
+CACHE_GENERATIONS = int(os.getenv("CACHE_GENERATIONS", 3))  # previous versions of the schedule cache kept for recovery
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "cache/http_validators.json")
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "cache/ocr_results.json")
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 64))
+TABLE_LAYOUT_CACHE_PATH = os.getenv("TABLE_LAYOUT_CACHE_PATH", "cache/table_layouts.json")  # detected table grids per image layout
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH", "cache/file_ids.json")
+FILE_ID_CACHE_SIZE = int(os.getenv("FILE_ID_CACHE_SIZE", 2000))
+
+# Site polling settings (interval adapts to when changes are usually published)
+POLL_FAST_INTERVAL = float(os.getenv("POLL_FAST_INTERVAL", 45))  # seconds, hot windows and right after a change
+POLL_NORMAL_INTERVAL = float(os.getenv("POLL_NORMAL_INTERVAL", 300))  # seconds
+POLL_SLOW_INTERVAL = float(os.getenv("POLL_SLOW_INTERVAL", 1200))  # seconds, when history shows no changes at this time
+POLL_HOT_WINDOWS = os.getenv("POLL_HOT_WINDOWS", "20:00-24:00")  # comma-separated HH:MM-HH:MM (may cross midnight), tomorrow's schedule appears after 20:00
+POLL_AFTER_CHANGE_MINUTES = int(os.getenv("POLL_AFTER_CHANGE_MINUTES", 30))  # fast polling after a detected change
+POLL_HOT_MIN_DAYS = int(os.getenv("POLL_HOT_MIN_DAYS", 2))  # days with changes at this time of day to poll fast
+POLL_HISTORY_DAYS = int(os.getenv("POLL_HISTORY_DAYS", 28))  # change history kept
+POLL_MIN_HISTORY_DAYS = int(os.getenv("POLL_MIN_HISTORY_DAYS", 7))  # history needed before slowing down
+POLL_HISTORY_PATH = os.getenv("POLL_HISTORY_PATH", "cache/poll_history.json")
+
+# OCR stability settings (a flipped cell must be confirmed before it is published)
+OCR_STABLE_READS = int(os.getenv("OCR_STABLE_READS", 2))  # consecutive reads of an uncertain slot change
+OCR_CONFIDENCE_MARGIN = float(os.getenv("OCR_CONFIDENCE_MARGIN", 0.15))  # share of cell pixels; above it a change is published at once
 
+# HTTP client settings (site page and GPV images)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))  # open connections in total
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", 4))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", 300))  # seconds
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", 60))  # seconds an idle connection is kept open
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))  # seconds for a whole request
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))  # seconds
+IMAGE_FETCH_CONCURRENCY = int(os.getenv("IMAGE_FETCH_CONCURRENCY", 3))  # GPV images fetched and parsed at once
+
+# CPU pool settings (OCR and clock rendering)
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", 2))
+CPU_POOL_MAX_PENDING = int(os.getenv("CPU_POOL_MAX_PENDING", 8))  # tasks handed to the pool at once
+CPU_TASK_TIMEOUT = float(os.getenv("CPU_TASK_TIMEOUT", 60))  # seconds
+
+# Delivery settings (mass notifications and broadcasts)
+DELIVERY_RATE = float(os.getenv("DELIVERY_RATE", 30))  # messages per second, Telegram's global limit
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", 16))  # sends in flight at once
+DELIVERY_CHAT_INTERVAL = float(os.getenv("DELIVERY_CHAT_INTERVAL", 1.0))  # seconds between messages to one chat
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", 3))  # for network and server errors
+
+# Alert settings
+ALERT_LEAD_MINUTES = int(os.getenv("ALERT_LEAD_MINUTES", 30))  # minutes before a transition
+SENT_ALERTS_RETENTION_DAYS = int(os.getenv("SENT_ALERTS_RETENTION_DAYS", 30))  # history kept in the database
+SENT_ALERTS_MEMORY_DAYS = int(os.getenv("SENT_ALERTS_MEMORY_DAYS", 2))  # history kept in memory for dedup
+
 # Logging settings
 LOGS_PATH = os.getenv("LOGS_PATH", "logs/")
 
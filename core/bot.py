@@ -1,7 +1,6 @@
 import asyncio
 import logging
 from aiogram import Dispatcher
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 import os
 
@@ -9,27 +8,33 @@ import os
 load_dotenv()
 
 # Import settings
-from config.settings import TOKEN
+from config.settings import TOKEN, BOT_MODE
 
 # Import database functions
-from database import init_db
+from database import init_db, close_db
 
 # Import handlers
 from handlers import router as handlers_router
 
 # Import monitoring
-from utils.monitoring import monitor_job, send_upcoming_events_notifications
+from utils.polling import schedule_next_poll
+from utils.alerts import prune_alert_history
 
 # Import cache initialization
-from utils.cache import initialize_cache, update_clock_time_hands
+from utils.cache import initialize_cache
 
-# Import global bot instance
-from core.globals import bot
+# Import CPU pool and delivery engine for shutdown
+from utils.cpu_pool import shutdown_cpu_pool
+from utils.delivery import stop_delivery
+from utils.http_client import close_http_client
+
+# Import global bot and scheduler instances
+from core.globals import bot, scheduler
+from core.webhook import run_webhook
 
 # Initialize components
 logging.basicConfig(level=logging.INFO)
 dp = Dispatcher()
-scheduler = AsyncIOScheduler()
 
 async def main():
     """Main bot function"""
@@ -43,13 +48,25 @@ async def main():
     await initialize_cache()
 
     # Start scheduler
-    scheduler.add_job(monitor_job, 'interval', minutes=5)
-    scheduler.add_job(update_clock_time_hands, 'interval', hours=1)
-    scheduler.add_job(send_upcoming_events_notifications, 'cron', minute=30)  # Every hour at :30
+    # Outage alerts are one-shot jobs placed on every schedule change (see utils/alerts.py)
+    # monitor_job re-schedules itself with an adaptive interval (see utils/polling.py)
+    schedule_next_poll()
+    scheduler.add_job(prune_alert_history, 'cron', hour=3, minute=15)
     scheduler.start()
 
-    # Start polling
-    await dp.start_polling(bot)
+    # Start receiving updates
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            # getUpdates is refused while a webhook is set (e.g. after switching back from webhook mode)
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await stop_delivery()
+        await close_http_client()
+        shutdown_cpu_pool()
+        close_db()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
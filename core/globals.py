@@ -1,5 +1,9 @@
 from aiogram import Bot
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from config.settings import TOKEN
 
 # Global bot instance
-bot = Bot(token=TOKEN)
\ No newline at end of file
+bot = Bot(token=TOKEN)
+
+# Global scheduler (periodic jobs and one-shot alert jobs)
+scheduler = AsyncIOScheduler()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import signal
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from config.settings import (WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+                             WEBHOOK_MAX_CONCURRENT, WEBHOOK_MAX_PENDING, WEBHOOK_SHUTDOWN_TIMEOUT)
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that answers Telegram at once and handles updates in the background,
+    at most max_concurrent at a time. With max_pending updates already accepted it answers 503,
+    so Telegram redelivers the update later instead of the process piling up tasks.
+    """
+
+    def __init__(self, dispatcher, bot, max_concurrent, max_pending, shutdown_timeout, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.max_pending = max_pending
+        self.shutdown_timeout = shutdown_timeout
+        self._accepting = True
+
+    async def _background_feed_update(self, bot, update):
+        async with self._slots:
+            try:
+                await super()._background_feed_update(bot, update)
+            except Exception:
+                logging.exception(f"Error handling webhook update {update.get('update_id')}")
+
+    async def _handle_request_background(self, bot, request):
+        if not self._accepting or len(self._background_feed_update_tasks) >= self.max_pending:
+            return web.Response(status=503, text="Busy")
+        return await super()._handle_request_background(bot, request)
+
+    async def close(self):
+        """Stop taking updates, let the accepted ones finish, then close the bot session"""
+        self._accepting = False
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logging.info(f"Waiting for {len(pending)} webhook updates to finish")
+            _, pending = await asyncio.wait(pending, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logging.warning(f"{len(pending)} webhook updates cancelled on shutdown")
+        await super().close()
+
+def create_webhook_app(dispatcher, bot):
+    """aiohttp application serving Telegram updates on WEBHOOK_PATH"""
+    app = web.Application()
+    handler = LimitedRequestHandler(
+        dispatcher, bot,
+        max_concurrent=WEBHOOK_MAX_CONCURRENT,
+        max_pending=WEBHOOK_MAX_PENDING,
+        shutdown_timeout=WEBHOOK_SHUTDOWN_TIMEOUT,
+        secret_token=WEBHOOK_SECRET or None,
+    )
+    handler.register(app, path=WEBHOOK_PATH)
+    # Startup/shutdown handlers of the dispatcher, like start_polling does
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+async def run_webhook(dispatcher, bot):
+    """Serve webhook updates until SIGINT/SIGTERM, then shut down gracefully"""
+    if not WEBHOOK_SECRET:
+        logging.warning("WEBHOOK_SECRET is not set, webhook requests are not authenticated")
+
+    runner = web.AppRunner(create_webhook_app(dispatcher, bot), handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logging.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C raises KeyboardInterrupt, cleanup still runs in finally
+            pass
+
+    try:
+        if WEBHOOK_URL:
+            # Every process registers the same URL, so this is safe behind a load balancer
+            await bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None,
+                                  allowed_updates=dispatcher.resolve_used_update_types())
+            logging.info(f"Webhook registered: {WEBHOOK_URL}")
+        else:
+            logging.warning("WEBHOOK_URL is not set, webhook is not registered in Telegram")
+        await stop.wait()
+    finally:
+        # Closes the listening socket first, then waits for accepted updates (LimitedRequestHandler.close)
+        logging.info("Stopping webhook server")
+        await runner.cleanup()
@@ -1,15 +1,15 @@
 # Database module for user management and data storage
 
-from .connection import init_db, get_connection
-from .users import update_user_queue, get_user_subqueue
+from .connection import init_db, get_connection, get_db_connection, run_read, run_write, close_db
+from .users import update_user_queue, get_user_subqueue, get_all_user_ids, get_bot_stats, mark_user_blocked, unmark_user_blocked, get_blocked_user_ids
 from .addresses import get_user_addresses, add_user_address, update_address_name, update_address_queue, set_main_address, delete_user_address
-from .notifications import get_user_notification_settings, set_user_notification_settings, init_user_notification_settings
+from .notifications import get_user_notification_settings, set_user_notification_settings, init_user_notification_settings, ensure_notification_settings, get_notification_audience
 from .schedules import init_manual_schedules_table, get_manual_schedule, set_manual_schedule, delete_manual_schedule, get_combined_schedule
 
 __all__ = [
-    'init_db', 'get_connection',
-    'update_user_queue', 'get_user_subqueue',
+    'init_db', 'get_connection', 'get_db_connection', 'run_read', 'run_write', 'close_db',
+    'update_user_queue', 'get_user_subqueue', 'get_all_user_ids', 'get_bot_stats', 'mark_user_blocked', 'unmark_user_blocked', 'get_blocked_user_ids',
     'get_user_addresses', 'add_user_address', 'update_address_name', 'update_address_queue', 'set_main_address', 'delete_user_address',
-    'get_user_notification_settings', 'set_user_notification_settings', 'init_user_notification_settings',
+    'get_user_notification_settings', 'set_user_notification_settings', 'init_user_notification_settings', 'ensure_notification_settings', 'get_notification_audience',
     'init_manual_schedules_table', 'get_manual_schedule', 'set_manual_schedule', 'delete_manual_schedule', 'get_combined_schedule'
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from .connection import get_db_connection
-from .notifications import set_user_notification_settings
+from .notifications import set_user_notification_settings, invalidate_notification_audience
 
 def get_user_addresses(user_id):
     """Get all user addresses"""
@@ -24,6 +24,7 @@ def add_user_address(user_id, name, subqueue):
         cursor.execute('INSERT OR REPLACE INTO user_notifications (user_id, address_name, notifications_enabled, new_schedule_enabled, schedule_changes_enabled) VALUES (?, ?, 1, 1, 1)',
                        (user_id, name))
         conn.commit()
+    invalidate_notification_audience()
 
 def update_address_name(user_id, old_name, new_name):
     """Update address name"""
@@ -31,6 +32,7 @@ def update_address_name(user_id, old_name, new_name):
         cursor = conn.cursor()
         cursor.execute('UPDATE addresses SET name = ? WHERE user_id = ? AND name = ?', (new_name, user_id, old_name))
         conn.commit()
+    invalidate_notification_audience()
 
 def update_address_queue(user_id, name, new_subqueue):
     """Update address subqueue"""
@@ -38,6 +40,7 @@ def update_address_queue(user_id, name, new_subqueue):
         cursor = conn.cursor()
         cursor.execute('UPDATE addresses SET subqueue = ? WHERE user_id = ? AND name = ?', (new_subqueue, user_id, name))
         conn.commit()
+    invalidate_notification_audience()
 
 def set_main_address(user_id, name):
     """Set address as main"""
@@ -46,6 +49,7 @@ def set_main_address(user_id, name):
         cursor.execute('UPDATE addresses SET is_main = 0 WHERE user_id = ?', (user_id,))
         cursor.execute('UPDATE addresses SET is_main = 1 WHERE user_id = ? AND name = ?', (user_id, name))
         conn.commit()
+    invalidate_notification_audience()
 
 def delete_user_address(user_id, name):
     """Delete user address"""
@@ -64,11 +68,4 @@ def delete_user_address(user_id, name):
             # Remove settings for this address
             cursor.execute('DELETE FROM user_notifications WHERE user_id = ? AND address_name = ?', (user_id, name))
         conn.commit()
-
-def get_all_user_addresses():
-    """Get all user addresses for all users (for monitoring)"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_id, name, subqueue FROM addresses ORDER BY user_id, name')
-        addresses = cursor.fetchall()
-        return addresses
\ No newline at end of file
+    invalidate_notification_audience()
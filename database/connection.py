@@ -1,36 +1,96 @@
 import sqlite3
 import os
 import logging
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from config.settings import DB_READ_WORKERS, DB_BUSY_TIMEOUT, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE
+
+# One long-lived connection per thread (sqlite3 connections must stay in the thread that opened them)
+_local = threading.local()
+# Single writer thread: writes are serialized here instead of fighting for the lock with busy timeouts
+_write_executor = None
+# Readers run in parallel, WAL lets them see the last commit while the writer works
+_read_executor = None
 
 def get_db_path():
     """Get the database file path from environment or default"""
     return os.getenv('DATABASE_PATH', 'users.db')
 
+def _open_connection(db_path):
+    """Open connection with WAL journal and tuned pragmas"""
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT, cached_statements=DB_STATEMENT_CACHE_SIZE)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # With WAL, NORMAL syncs on checkpoint only and still can't corrupt the database
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA mmap_size={int(DB_MMAP_SIZE)}')
+    return conn
+
+def _thread_connection():
+    """Get the persistent connection of the current thread, opening it on first use"""
+    db_path = get_db_path()
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != db_path:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(db_path)
+        _local.conn, _local.path = conn, db_path
+    return conn
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections with proper cleanup"""
-    conn = None
+    """Context manager for the persistent connection of the current thread; rolls back on error"""
+    conn = _thread_connection()
     try:
-        conn = sqlite3.connect(get_db_path(), timeout=30.0)
         yield conn
     except Exception as e:
         logging.error(f"Database connection error: {e}")
-        if conn:
-            conn.rollback()
+        conn.rollback()
         raise
-    finally:
-        if conn:
-            conn.close()
 
 def get_connection():
-    """Get database connection with timeout to avoid locking (deprecated, use get_db_connection)"""
-    return sqlite3.connect(get_db_path(), timeout=30.0)
+    """Get a new database connection, caller must close it (deprecated, use get_db_connection)"""
+    return _open_connection(get_db_path())
+
+def _get_write_executor():
+    global _write_executor
+    if _write_executor is None:
+        _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-write')
+    return _write_executor
+
+def _get_read_executor():
+    global _read_executor
+    if _read_executor is None:
+        _read_executor = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix='db-read')
+    return _read_executor
+
+async def run_read(func, *args, **kwargs):
+    """Run read-only database function func(*args, **kwargs) in the read pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_read_executor(), functools.partial(func, *args, **kwargs))
+
+async def run_write(func, *args, **kwargs):
+    """Run database function that writes in the writer thread and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_write_executor(), functools.partial(func, *args, **kwargs))
+
+def close_db():
+    """Finish pending writes and stop database threads (on bot shutdown)"""
+    global _write_executor, _read_executor
+    for executor in (_write_executor, _read_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _write_executor = _read_executor = None
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
 
 def init_db():
     """Initialize the database with all required tables"""
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Users table
@@ -48,8 +108,27 @@ def init_db():
     # Global settings (last schedule date)
     cursor.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
 
-    # Notification history (to avoid duplicates)
-    cursor.execute('CREATE TABLE IF NOT EXISTS sent_alerts (user_id INTEGER, event_time TEXT, event_date TEXT)')
+    # Notification history (to avoid duplicates): one row per user, event and address
+    cursor.execute('PRAGMA table_info(sent_alerts)')
+    sent_alerts_columns = [row[1] for row in cursor.fetchall()]
+    if sent_alerts_columns and 'event_type' not in sent_alerts_columns:
+        # Migrate old table without key: keep history, mark rows as "any event/address"
+        cursor.execute('ALTER TABLE sent_alerts RENAME TO sent_alerts_old')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sent_alerts (
+        user_id INTEGER,
+        event_date TEXT,
+        event_time TEXT,
+        event_type TEXT NOT NULL DEFAULT '',
+        address_name TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (user_id, event_date, event_time, event_type, address_name)
+    ) WITHOUT ROWID''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sent_alerts_date ON sent_alerts (event_date)')
+    if sent_alerts_columns and 'event_type' not in sent_alerts_columns:
+        cursor.execute('INSERT OR IGNORE INTO sent_alerts (user_id, event_date, event_time) SELECT user_id, event_date, event_time FROM sent_alerts_old')
+        cursor.execute('DROP TABLE sent_alerts_old')
+
+    # Users that blocked the bot (messages to them fail permanently)
+    cursor.execute('CREATE TABLE IF NOT EXISTS blocked_users (user_id INTEGER PRIMARY KEY, reason TEXT, blocked_at TEXT)')
 
     # Notification settings
     cursor.execute('''CREATE TABLE IF NOT EXISTS user_notifications (
@@ -104,7 +183,3 @@ def init_db():
 
     conn.commit()
     conn.close()
-
-def get_connection():
-    """Get database connection with timeout to avoid locking"""
-    return sqlite3.connect(get_db_path(), timeout=30.0)
\ No newline at end of file
@@ -1,6 +1,20 @@
 import logging
+import threading
+from datetime import datetime, timedelta
+from config.settings import SENT_ALERTS_RETENTION_DAYS, SENT_ALERTS_MEMORY_DAYS
 from .connection import get_db_connection
 
+# subqueue -> [(user_id, address_name), ...] of addresses with notifications enabled, None until first read.
+# Dropped on every settings/address write; the version guards against storing a result read before a write.
+_audience = None
+_audience_version = 0
+_audience_lock = threading.Lock()
+
+# Keys (user_id, event_date, event_time, event_type, address_name) of alerts sent for recent events,
+# so dedup checks don't touch the database. None until first use.
+_recent_alerts = None
+_recent_alerts_lock = threading.Lock()
+
 def get_user_notification_settings(user_id, address_name=None):
     """Get notification settings for user and optional address"""
     try:
@@ -10,7 +24,7 @@ def get_user_notification_settings(user_id, address_name=None):
                 address_name = ''
             cursor.execute('SELECT notifications_enabled, new_schedule_enabled, schedule_changes_enabled FROM user_notifications WHERE user_id = ? AND address_name = ?', (user_id, address_name))
             res = cursor.fetchone()
-            logging.info(f"Get settings for user {user_id}, addr {address_name}: {res}")
+            logging.debug(f"Get settings for user {user_id}, addr {address_name}: {res}")
             if res:
                 return {
                     'notifications_enabled': res[0],
@@ -19,7 +33,7 @@ def get_user_notification_settings(user_id, address_name=None):
                 }
             else:
                 # Default settings
-                logging.info(f"No row found for user {user_id}, addr {address_name}, returning defaults")
+                logging.debug(f"No row found for user {user_id}, addr {address_name}, returning defaults")
                 return {
                     'notifications_enabled': True,
                     'new_schedule_enabled': True,
@@ -53,11 +67,108 @@ def set_user_notification_settings(user_id, address_name, notifications_enabled,
                            (user_id, address_name, notifications_enabled, new_schedule_enabled, schedule_changes_enabled))
 
             conn.commit()
+            invalidate_notification_audience()
             logging.info(f"Successfully set notifications for user {user_id}, addr {address_name}")
     except Exception as e:
         logging.error(f"Error setting notification settings for user {user_id}, addr {address_name}: {e}")
         raise
 
+def ensure_notification_settings(user_id, address_name=None):
+    """Create default notification settings for user and optional address if there are none"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('INSERT OR IGNORE INTO user_notifications (user_id, address_name, notifications_enabled, new_schedule_enabled, schedule_changes_enabled) VALUES (?, ?, 1, 1, 1)',
+                       (user_id, address_name or ''))
+        conn.commit()
+    invalidate_notification_audience()
+
+def invalidate_notification_audience():
+    """Drop cached audience (call after any write to addresses or user_notifications)"""
+    global _audience, _audience_version
+    with _audience_lock:
+        _audience = None
+        _audience_version += 1
+
+def get_notification_audience():
+    """
+    Get addresses to notify, grouped by subqueue: {subqueue: [(user_id, address_name), ...]}.
+    One JOIN over addresses and general + per-address settings (missing settings mean enabled).
+    Cached until the next settings/address write; the result must not be modified.
+    """
+    global _audience
+    with _audience_lock:
+        if _audience is not None:
+            return _audience
+        version = _audience_version
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT a.user_id, a.name, a.subqueue
+            FROM addresses a
+            LEFT JOIN user_notifications g ON g.user_id = a.user_id AND g.address_name = ''
+            LEFT JOIN user_notifications n ON n.user_id = a.user_id AND n.address_name = a.name
+            WHERE COALESCE(g.notifications_enabled, 1) AND COALESCE(n.notifications_enabled, 1)
+            ORDER BY a.user_id, a.name
+        ''')
+        audience = {}
+        for user_id, name, subqueue in cursor.fetchall():
+            audience.setdefault(subqueue, []).append((user_id, name))
+
+    with _audience_lock:
+        if version == _audience_version:
+            _audience = audience
+    return audience
+
+def _load_recent_alerts():
+    """Load keys of alerts for recent and upcoming events into memory (once per process)"""
+    global _recent_alerts
+    with _recent_alerts_lock:
+        if _recent_alerts is None:
+            since = (datetime.now() - timedelta(days=SENT_ALERTS_MEMORY_DAYS)).strftime("%Y-%m-%d")
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT user_id, event_date, event_time, event_type, address_name FROM sent_alerts WHERE event_date >= ?', (since,))
+                _recent_alerts = set(cursor.fetchall())
+        return _recent_alerts
+
+def filter_unsent_alerts(keys):
+    """
+    Keep alert keys (user_id, event_date, event_time, event_type, address_name) that were not sent yet.
+    Checked against the in-memory set of recent alerts, dates are YYYY-MM-DD.
+    """
+    recent = _load_recent_alerts()
+    # Rows migrated from the old table have no event type/address and cover the whole event
+    return [key for key in keys if key not in recent and (key[0], key[1], key[2], '', '') not in recent]
+
+def record_sent_alerts(keys):
+    """Add sent alerts to notification history in one batch"""
+    if not keys:
+        return
+    recent = _load_recent_alerts()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('INSERT OR IGNORE INTO sent_alerts (user_id, event_date, event_time, event_type, address_name) VALUES (?, ?, ?, ?, ?)', keys)
+        conn.commit()
+    recent.update(keys)
+
+def prune_sent_alerts(days=None):
+    """Delete notification history older than days (SENT_ALERTS_RETENTION_DAYS by default), returns deleted rows"""
+    days = SENT_ALERTS_RETENTION_DAYS if days is None else days
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM sent_alerts WHERE event_date < ?', (cutoff,))
+        deleted = cursor.rowcount
+        conn.commit()
+    # Memory only needs the recent window
+    memory_cutoff = (datetime.now() - timedelta(days=SENT_ALERTS_MEMORY_DAYS)).strftime("%Y-%m-%d")
+    with _recent_alerts_lock:
+        if _recent_alerts is not None:
+            for key in [k for k in _recent_alerts if k[1] < memory_cutoff]:
+                _recent_alerts.discard(key)
+    return deleted
+
 def init_user_notification_settings(user_id):
     """Initialize default notification settings for user"""
     from .addresses import get_user_addresses
@@ -1,27 +1,26 @@
 import logging
-from .connection import get_connection
+from .connection import get_db_connection
 
 def init_manual_schedules_table():
     """Create manual schedules table if it doesn't exist"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS manual_schedules (
-                id INTEGER PRIMARY KEY,
-                date TEXT NOT NULL,
-                subqueue TEXT NOT NULL,
-                guaranteed_text TEXT,
-                possible_text TEXT,
-                created_by INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1,
-                UNIQUE(date, subqueue)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS manual_schedules (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    subqueue TEXT NOT NULL,
+                    guaranteed_text TEXT,
+                    possible_text TEXT,
+                    created_by INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_active BOOLEAN DEFAULT 1,
+                    UNIQUE(date, subqueue)
+                )
+            ''')
+            conn.commit()
         logging.info("Manual schedules table initialized")
     except Exception as e:
         logging.error(f"Error creating manual_schedules table: {e}")
@@ -29,15 +28,14 @@ def init_manual_schedules_table():
 def get_manual_schedule(date, subqueue):
     """Get manual schedule for date and subqueue"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT guaranteed_text, possible_text, admin_id, created_at
-            FROM manual_schedules
-            WHERE date = ? AND subqueue = ?
-        ''', (date, subqueue))
-        res = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT guaranteed_text, possible_text, admin_id, created_at
+                FROM manual_schedules
+                WHERE date = ? AND subqueue = ?
+            ''', (date, subqueue))
+            res = cursor.fetchone()
         if res:
             return {
                 'guaranteed_text': res[0] or '',
@@ -53,15 +51,14 @@ def get_manual_schedule(date, subqueue):
 def set_manual_schedule(date, subqueue, guaranteed_text, possible_text, user_id):
     """Create or update manual schedule"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO manual_schedules
-            (date, subqueue, guaranteed_text, possible_text, admin_id, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-        ''', (date, subqueue, guaranteed_text, possible_text, user_id))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO manual_schedules
+                (date, subqueue, guaranteed_text, possible_text, admin_id, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ''', (date, subqueue, guaranteed_text, possible_text, user_id))
+            conn.commit()
         logging.info(f"Manual schedule set for {date}, {subqueue} by user {user_id}")
         return True
     except Exception as e:
@@ -71,14 +68,13 @@ def set_manual_schedule(date, subqueue, guaranteed_text, possible_text, user_id)
 def delete_manual_schedule(date, subqueue):
     """Delete manual schedule"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            DELETE FROM manual_schedules
-            WHERE date = ? AND subqueue = ?
-        ''', (date, subqueue))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM manual_schedules
+                WHERE date = ? AND subqueue = ?
+            ''', (date, subqueue))
+            conn.commit()
         logging.info(f"Manual schedule deactivated for {date}, {subqueue}")
         return True
     except Exception as e:
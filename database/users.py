@@ -1,18 +1,72 @@
-from .connection import get_connection
+from .connection import get_db_connection
 
 def update_user_queue(user_id, subqueue):
     """Update or insert user queue"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('INSERT OR REPLACE INTO users (user_id, subqueue) VALUES (?, ?)', (user_id, subqueue))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('INSERT OR REPLACE INTO users (user_id, subqueue) VALUES (?, ?)', (user_id, subqueue))
+        conn.commit()
 
 def get_user_subqueue(user_id):
     """Get user's main address subqueue"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT subqueue FROM addresses WHERE user_id = ? AND is_main = 1', (user_id,))
-    res = cursor.fetchone()
-    conn.close()
-    return res[0] if res else None
\ No newline at end of file
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT subqueue FROM addresses WHERE user_id = ? AND is_main = 1', (user_id,))
+        res = cursor.fetchone()
+        return res[0] if res else None
+
+def mark_user_blocked(user_id, reason):
+    """Remember that messages to user fail permanently (bot blocked, account deleted)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('INSERT OR REPLACE INTO blocked_users (user_id, reason, blocked_at) VALUES (?, ?, CURRENT_TIMESTAMP)', (user_id, reason))
+        conn.commit()
+
+def unmark_user_blocked(user_id):
+    """Forget blocked state (user started the bot again)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM blocked_users WHERE user_id = ?', (user_id,))
+        conn.commit()
+
+def get_blocked_user_ids():
+    """Get ids of users that blocked the bot"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT user_id FROM blocked_users')
+        return [uid for (uid,) in cursor.fetchall()]
+
+def get_all_user_ids():
+    """Get ids of all users that have at least one address"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT user_id FROM addresses')
+        return [uid for (uid,) in cursor.fetchall()]
+
+def get_bot_stats(since_date):
+    """Get counters for /stats; since_date (YYYY-MM-DD) bounds the recent alerts count"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(DISTINCT user_id) FROM addresses')
+        total_users = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM addresses')
+        total_addresses = cursor.fetchone()[0]
+        cursor.execute('SELECT subqueue, COUNT(*) FROM addresses GROUP BY subqueue ORDER BY subqueue')
+        subqueue_stats = cursor.fetchall()
+        cursor.execute('SELECT COUNT(DISTINCT user_id) FROM user_notifications')
+        users_with_config = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(DISTINCT user_id) FROM user_notifications WHERE notifications_enabled = 1')
+        users_with_notifications = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM sent_alerts')
+        total_alerts = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM sent_alerts WHERE event_date >= ?', (since_date,))
+        recent_alerts = cursor.fetchone()[0]
+        return {
+            'total_users': total_users,
+            'total_addresses': total_addresses,
+            'subqueue_stats': subqueue_stats,
+            'users_with_config': users_with_config,
+            'users_with_notifications': users_with_notifications,
+            'total_alerts': total_alerts,
+            'recent_alerts': recent_alerts
+        }
\ No newline at end of file
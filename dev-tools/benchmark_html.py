@@ -0,0 +1,57 @@
+import sys
+import os
+import re
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bs4 import BeautifulSoup
+from utils.html_extract import extract_gpv_page, SUBQUEUE_RE
+
+def extract_with_soup(html):
+    """Стара реалізація: повне дерево BeautifulSoup, пошук img і get_text() по всьому документу"""
+    try:
+        soup = BeautifulSoup(html, 'lxml')
+    except Exception:
+        soup = BeautifulSoup(html, 'html.parser')
+    images = [(img.get('alt', ''), img['src']) for img in soup.find_all('img', alt=re.compile(r'ГПВ'))]
+    lines = {m[0]: m[1].strip() for m in SUBQUEUE_RE.findall(soup.get_text())}
+    return images, lines
+
+def extract_streaming(html):
+    """Нова реалізація: потоковий парсер з ранньою зупинкою"""
+    page = extract_gpv_page(html, collect_text=True)
+    return page.images, page.subqueue_lines
+
+def benchmark(func, html, runs):
+    """Середній час одного виклику в мілісекундах і пікова пам'ять одного виклику в КБ"""
+    func(html)  # прогрів
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(html)
+    elapsed = (time.perf_counter() - start) / runs * 1000
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+if __name__ == "__main__":
+    page_path = sys.argv[1] if len(sys.argv) > 1 else 'test-data/hoe_page.html'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with open(page_path, 'rb') as f:
+        html = f.read()
+
+    old_result = extract_with_soup(html)
+    new_result = extract_streaming(html)
+    print(f"Результати однакові: {old_result == new_result}")
+    print(f"Зображень ГПВ: {len(new_result[0])}, рядків підчерг: {len(new_result[1])}")
+
+    old_ms, old_kb = benchmark(extract_with_soup, html, runs)
+    new_ms, new_kb = benchmark(extract_streaming, html, runs)
+    print(f"BeautifulSoup: {old_ms:.2f} мс, пік {old_kb:.0f} КБ")
+    print(f"Потоковий:     {new_ms:.2f} мс, пік {new_kb:.0f} КБ")
+    print(f"Прискорення:   x{old_ms / new_ms:.1f}, пам'ять x{old_kb / new_kb:.1f}")
@@ -0,0 +1,78 @@
+import sys
+import os
+import time
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr.image_processing import (classify_table_cells, cells_to_schedules, load_table_bounds, BLUE_LOWER, BLUE_UPPER,
+                                  GRAY_LOWER, GRAY_UPPER, WHITE_LOWER, WHITE_UPPER)
+from utils.slots import parse_schedule_text
+
+def parse_table_colors_per_cell(img):
+    """Стара реалізація: окреме HSV-перетворення і три inRange на кожну клітинку"""
+    bounds = load_table_bounds(img)
+    schedules = {}
+    for row in range(bounds['rows']):
+        subqueue = f"{row//2 + 1}.{row%2 + 1}"
+        intervals_off = []
+        intervals_possible = []
+        for col in range(bounds['cols']):
+            x1 = bounds['table_left'] + col * bounds['cell_width']
+            y1 = bounds['table_top'] + row * bounds['cell_height']
+            x2 = x1 + bounds['cell_width']
+            y2 = y1 + bounds['cell_height']
+            cell_roi = img[y1+3:y2-3, x1+3:x2-3]
+            if cell_roi.size == 0:
+                continue
+            hsv_cell = cv2.cvtColor(cell_roi, cv2.COLOR_BGR2HSV)
+            blue_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, BLUE_LOWER, BLUE_UPPER))
+            gray_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, GRAY_LOWER, GRAY_UPPER))
+            white_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, WHITE_LOWER, WHITE_UPPER))
+            total_pixels = cell_roi.size // 3
+            max_pixels = max(blue_pixels, gray_pixels, white_pixels)
+            if max_pixels / total_pixels > 0.3:
+                if blue_pixels == max_pixels:
+                    intervals_off.append(f"{col:02d}:00-{col + 1:02d}:00")
+                elif gray_pixels == max_pixels:
+                    intervals_possible.append(f"{col:02d}:00-{col + 1:02d}:00")
+        schedule_parts = []
+        if intervals_off:
+            schedule_parts.append("Вимкнено: " + ", ".join(intervals_off))
+        if intervals_possible:
+            schedule_parts.append("Можливо вимкнено: " + ", ".join(intervals_possible))
+        if schedule_parts:
+            schedules[subqueue] = "; ".join(schedule_parts)
+    return schedules
+
+def parse_table_colors_vectorized(img):
+    """Нова реалізація на тих самих межах таблиці (без пошуку сітки), щоб порівнювати лише класифікацію"""
+    return cells_to_schedules(classify_table_cells(img, load_table_bounds(img)))
+
+def benchmark(func, img, runs):
+    """Середній час одного виклику в мілісекундах"""
+    func(img)  # прогрів
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(img)
+    return (time.perf_counter() - start) / runs * 1000
+
+if __name__ == "__main__":
+    image_path = sys.argv[1] if len(sys.argv) > 1 else 'test-data/test_schedule.png'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    img = cv2.imread(image_path)
+    if img is None:
+        print(f"Не вдалося завантажити зображення: {image_path}")
+        sys.exit(1)
+
+    old_result = parse_table_colors_per_cell(img)
+    new_result = parse_table_colors_vectorized(img)
+    old_schedules = {subqueue: parse_schedule_text(text) for subqueue, text in old_result.items()}
+    print(f"Результати однакові: {old_schedules == new_result}")
+
+    old_ms = benchmark(parse_table_colors_per_cell, img, runs)
+    new_ms = benchmark(parse_table_colors_vectorized, img, runs)
+    print(f"По клітинках:   {old_ms:.2f} мс")
+    print(f"Векторизовано: {new_ms:.2f} мс")
+    print(f"Прискорення:    x{old_ms / new_ms:.1f}")
@@ -0,0 +1,48 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config.settings import WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET
+
+def load_updates(path):
+    """Записані оновлення: JSON-масив або по одному оновленню в рядку (JSON Lines)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+async def post_update(session, url, update, limit):
+    """Відправляє одне оновлення так само, як Telegram: POST JSON із секретним заголовком"""
+    headers = {'X-Telegram-Bot-Api-Secret-Token': WEBHOOK_SECRET} if WEBHOOK_SECRET else {}
+    async with limit:
+        start = time.perf_counter()
+        async with session.post(url, json=update, headers=headers) as response:
+            await response.read()
+            return update.get('update_id'), response.status, (time.perf_counter() - start) * 1000
+
+async def replay(updates, url, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(*(post_update(session, url, update, limit) for update in updates))
+
+if __name__ == "__main__":
+    # Бот має бути запущений з BOT_MODE=webhook (WEBHOOK_URL можна не задавати)
+    updates_path = sys.argv[1] if len(sys.argv) > 1 else 'test-data/webhook_updates.json'
+    url = sys.argv[2] if len(sys.argv) > 2 else f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    updates = load_updates(updates_path)
+    start = time.perf_counter()
+    results = asyncio.run(replay(updates, url, concurrency))
+    elapsed = time.perf_counter() - start
+
+    for update_id, status, ms in results:
+        print(f"update {update_id}: HTTP {status}, {ms:.1f} мс")
+    ok = sum(1 for _, status, _ in results if status == 200)
+    print(f"Відправлено {len(results)} оновлень за {elapsed:.2f} с, прийнято {ok}")
@@ -3,8 +3,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from database.addresses import get_user_addresses, add_user_address, update_address_queue, set_main_address, delete_user_address
 from database.users import update_user_queue
-from database.notifications import get_user_notification_settings, set_user_notification_settings
-from database.connection import get_db_connection
+from database.notifications import get_user_notification_settings, set_user_notification_settings, ensure_notification_settings
+from database.connection import run_read, run_write
 from formatting.keyboard_builder import get_queue_keyboard, get_address_selection_keyboard
 from utils.schedule_sender import send_schedule_logic
 from core.globals import bot
@@ -22,7 +22,7 @@ async def callback_set_queue(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         name = data['addr_name']
         try:
-            add_user_address(callback.from_user.id, name, subq)
+            await run_write(add_user_address, callback.from_user.id, name, subq)
             await callback.message.edit_text(f"✅ <b>Успішно!</b>\nСтворено адресу <b>{name}</b> з чергою <b>{subq}</b>.", parse_mode="HTML")
             await state.clear()
         except ValueError as e:
@@ -32,16 +32,16 @@ async def callback_set_queue(callback: types.CallbackQuery, state: FSMContext):
         # Editing existing address queue
         data = await state.get_data()
         addr_name = data['edit_addr_name']
-        update_address_queue(callback.from_user.id, addr_name, subq)
+        await run_write(update_address_queue, callback.from_user.id, addr_name, subq)
         await callback.message.edit_text(f"✅ <b>Успішно!</b>\nЗмінено чергу для адреси <b>{addr_name}</b> на <b>{subq}</b>.", parse_mode="HTML")
         await state.clear()
     else:
         # Update main address queue
-        addresses = get_user_addresses(callback.from_user.id)
+        addresses = await run_read(get_user_addresses, callback.from_user.id)
         if addresses:
             main_addr = next((name for name, _, is_main in addresses if is_main), None)
             if main_addr:
-                update_address_queue(callback.from_user.id, main_addr, subq)
+                await run_write(update_address_queue, callback.from_user.id, main_addr, subq)
                 await callback.message.edit_text(f"✅ <b>Успішно!</b>\nОбрано підчергу <b>{subq}</b> для адреси <b>{main_addr}</b>.", parse_mode="HTML")
                 await send_schedule_logic(callback.from_user.id, subq, "today")
             else:
@@ -49,8 +49,8 @@ async def callback_set_queue(callback: types.CallbackQuery, state: FSMContext):
         else:
             # If no addresses, create "Дім"
             try:
-                add_user_address(callback.from_user.id, "Дім", subq)
-                set_main_address(callback.from_user.id, "Дім")
+                await run_write(add_user_address, callback.from_user.id, "Дім", subq)
+                await run_write(set_main_address, callback.from_user.id, "Дім")
                 await callback.message.edit_text(f"✅ <b>Успішно!</b>\nСтворено адресу <b>Дім</b> з чергою <b>{subq}</b>.", parse_mode="HTML")
                 await send_schedule_logic(callback.from_user.id, subq, "today")
             except ValueError as e:
@@ -67,18 +67,13 @@ async def addr_add(callback: types.CallbackQuery, state: FSMContext):
 async def settings_general(callback: types.CallbackQuery):
     user_id = callback.from_user.id
 
-    # Перевіряємо, чи існують загальні налаштування
+    # Ініціалізуємо загальні налаштування за замовчуванням, якщо їх немає
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM user_notifications WHERE user_id = ? AND address_name = ?', (user_id, ''))
-            if cursor.fetchone()[0] == 0:
-                # Ініціалізуємо загальні налаштування за замовчуванням
-                set_user_notification_settings(user_id, None, True, True, True)
+        await run_write(ensure_notification_settings, user_id)
     except Exception as e:
         logging.error(f"Error initializing general settings: {e}")
 
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
 
     text = "📢 <b>Загальні налаштування сповіщень</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
@@ -99,18 +94,13 @@ async def settings_general(callback: types.CallbackQuery):
 @router.callback_query(F.data == "settings_back")
 async def settings_back(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    addresses = get_user_addresses(user_id)
+    addresses = await run_read(get_user_addresses, user_id)
 
     # Ініціалізуємо налаштування для всіх адрес, якщо вони не існують
     for name, _, _ in addresses:
-        # Перевіряємо, чи існують налаштування для цієї адреси
+        # Ініціалізуємо налаштування за замовчуванням, якщо їх немає
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM user_notifications WHERE user_id = ? AND address_name = ?', (user_id, name))
-                if cursor.fetchone()[0] == 0:
-                    # Ініціалізуємо налаштування за замовчуванням
-                    set_user_notification_settings(user_id, name, True, True, True)
+            await run_write(ensure_notification_settings, user_id, name)
         except Exception as e:
             logging.error(f"Error initializing settings for address {name}: {e}")
 
@@ -122,7 +112,7 @@ async def settings_back(callback: types.CallbackQuery):
     ])
 
     for name, _, _ in addresses:
-        settings = get_user_notification_settings(user_id, name)
+        settings = await run_read(get_user_notification_settings, user_id, name)
         status = "✅" if settings['notifications_enabled'] else "❌"
         kb.inline_keyboard.append([InlineKeyboardButton(text=f"🏠 {name} {status}", callback_data=f"toggle_addr_{name}")])
 
@@ -134,14 +124,14 @@ async def toggle_addr(callback: types.CallbackQuery):
     addr_name = callback.data.replace("toggle_addr_", "")
     user_id = callback.from_user.id
 
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     new_val = not settings['notifications_enabled']
-    set_user_notification_settings(user_id, addr_name, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
+    await run_write(set_user_notification_settings, user_id, addr_name, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
 
     await callback.answer(f"Сповіщення для '{addr_name}' {'увімкнено' if new_val else 'вимкнено'}")
 
     # Оновлюємо повідомлення відразу
-    addresses = get_user_addresses(user_id)
+    addresses = await run_read(get_user_addresses, user_id)
 
     text = "⚙️ <b>Налаштування сповіщень бота</b>\n\n"
     text += "Оберіть, що налаштувати:\n"
@@ -151,7 +141,7 @@ async def toggle_addr(callback: types.CallbackQuery):
     ])
 
     for name, _, _ in addresses:
-        settings = get_user_notification_settings(user_id, name)
+        settings = await run_read(get_user_notification_settings, user_id, name)
         status = "✅" if settings['notifications_enabled'] else "❌"
         kb.inline_keyboard.append([InlineKeyboardButton(text=f"🏠 {name} {status}", callback_data=f"toggle_addr_{name}")])
 
@@ -160,7 +150,7 @@ async def toggle_addr(callback: types.CallbackQuery):
 # Address management handlers
 @router.callback_query(F.data == "addr_edit_name")
 async def addr_edit_name(callback: types.CallbackQuery):
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     if not addresses:
         await callback.message.edit_text("❌ У вас немає адрес для редагування.")
         return
@@ -178,7 +168,7 @@ async def addr_edit_name(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "addr_edit_queue")
 async def addr_edit_queue(callback: types.CallbackQuery):
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     if not addresses:
         await callback.message.edit_text("❌ У вас немає адрес для зміни черги.")
         return
@@ -196,7 +186,7 @@ async def addr_edit_queue(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "addr_set_main")
 async def addr_set_main(callback: types.CallbackQuery):
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     if not addresses:
         await callback.message.edit_text("❌ У вас немає адрес.")
         return
@@ -214,7 +204,7 @@ async def addr_set_main(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "addr_delete")
 async def addr_delete(callback: types.CallbackQuery):
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     if not addresses:
         await callback.message.edit_text("❌ У вас немає адрес для видалення.")
         return
@@ -232,7 +222,7 @@ async def addr_delete(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "addr_view_schedules")
 async def addr_view_schedules(callback: types.CallbackQuery):
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     if not addresses:
         await callback.message.edit_text("❌ У вас немає адрес.")
         return
@@ -251,7 +241,7 @@ async def addr_view_schedules(callback: types.CallbackQuery):
 @router.callback_query(F.data == "addr_back")
 async def addr_back(callback: types.CallbackQuery, state: FSMContext):
     await state.clear()
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
 
     text = "🏠 <b>Ваші адреси:</b>\n\n"
     for name, subq, is_main in addresses:
@@ -293,14 +283,14 @@ async def edit_queue(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("set_main_"))
 async def set_main(callback: types.CallbackQuery):
     addr_name = callback.data.replace("set_main_", "")
-    set_main_address(callback.from_user.id, addr_name)
+    await run_write(set_main_address, callback.from_user.id, addr_name)
     await callback.message.edit_text(f"✅ <b>Успішно!</b>\nАдреса <b>{addr_name}</b> встановлена як основна.", parse_mode="HTML")
     await callback.answer()
 
 @router.callback_query(F.data.startswith("delete_addr_"))
 async def delete_addr(callback: types.CallbackQuery):
     addr_name = callback.data.replace("delete_addr_", "")
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
 
     # Check if this is the only address
     if len(addresses) <= 1:
@@ -313,14 +303,14 @@ async def delete_addr(callback: types.CallbackQuery):
         await callback.message.edit_text("❌ Неможливо видалити основну адресу. Спочатку зробіть іншу адресу основною.")
         return
 
-    delete_user_address(callback.from_user.id, addr_name)
+    await run_write(delete_user_address, callback.from_user.id, addr_name)
     await callback.message.edit_text(f"✅ <b>Успішно!</b>\nАдреса <b>{addr_name}</b> видалена.", parse_mode="HTML")
     await callback.answer()
 
 @router.callback_query(F.data.startswith("view_schedule_"))
 async def view_schedule(callback: types.CallbackQuery):
     addr_name = callback.data.replace("view_schedule_", "")
-    addresses = get_user_addresses(callback.from_user.id)
+    addresses = await run_read(get_user_addresses, callback.from_user.id)
     addr_data = next((subq for name, subq, _ in addresses if name == addr_name), None)
 
     if not addr_data:
@@ -335,13 +325,13 @@ async def view_schedule(callback: types.CallbackQuery):
 @router.callback_query(F.data == "toggle_general_notifications")
 async def toggle_general_notifications(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     new_val = not settings['notifications_enabled']
-    set_user_notification_settings(user_id, None, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
+    await run_write(set_user_notification_settings, user_id, None, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
     await callback.answer(f"Загальні сповіщення {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the menu
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     text = "📢 <b>Загальні налаштування сповіщень</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Нові графіки: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
@@ -360,13 +350,13 @@ async def toggle_general_notifications(callback: types.CallbackQuery):
 @router.callback_query(F.data == "toggle_general_new")
 async def toggle_general_new(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     new_val = not settings['new_schedule_enabled']
-    set_user_notification_settings(user_id, None, settings['notifications_enabled'], new_val, settings['schedule_changes_enabled'])
+    await run_write(set_user_notification_settings, user_id, None, settings['notifications_enabled'], new_val, settings['schedule_changes_enabled'])
     await callback.answer(f"Сповіщення про нові графіки {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the menu
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     text = "📢 <b>Загальні налаштування сповіщень</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Нові графіки: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
@@ -385,13 +375,13 @@ async def toggle_general_new(callback: types.CallbackQuery):
 @router.callback_query(F.data == "toggle_general_changes")
 async def toggle_general_changes(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     new_val = not settings['schedule_changes_enabled']
-    set_user_notification_settings(user_id, None, settings['notifications_enabled'], settings['new_schedule_enabled'], new_val)
+    await run_write(set_user_notification_settings, user_id, None, settings['notifications_enabled'], settings['new_schedule_enabled'], new_val)
     await callback.answer(f"Сповіщення про зміни в графіках {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the menu
-    settings = get_user_notification_settings(user_id)
+    settings = await run_read(get_user_notification_settings, user_id)
     text = "📢 <b>Загальні налаштування сповіщень</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Нові графіки: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
@@ -412,13 +402,13 @@ async def toggle_general_changes(callback: types.CallbackQuery):
 async def toggle_addr_notifications(callback: types.CallbackQuery):
     addr_name = callback.data.replace("toggle_addr_notifications_", "")
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     new_val = not settings['notifications_enabled']
-    set_user_notification_settings(user_id, addr_name, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
+    await run_write(set_user_notification_settings, user_id, addr_name, new_val, settings['new_schedule_enabled'], settings['schedule_changes_enabled'])
     await callback.answer(f"Сповіщення про відключення для '{addr_name}' {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the address settings menu
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     text = f"🏠 <b>Налаштування для адреси '{addr_name}'</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Можливе відключення: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
@@ -438,13 +428,13 @@ async def toggle_addr_notifications(callback: types.CallbackQuery):
 async def toggle_addr_new(callback: types.CallbackQuery):
     addr_name = callback.data.replace("toggle_addr_new_", "")
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     new_val = not settings['new_schedule_enabled']
-    set_user_notification_settings(user_id, addr_name, settings['notifications_enabled'], new_val, settings['schedule_changes_enabled'])
+    await run_write(set_user_notification_settings, user_id, addr_name, settings['notifications_enabled'], new_val, settings['schedule_changes_enabled'])
     await callback.answer(f"Сповіщення про можливе відключення для '{addr_name}' {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the address settings menu
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     text = f"🏠 <b>Налаштування для адреси '{addr_name}'</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Можливе відключення: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
@@ -464,13 +454,13 @@ async def toggle_addr_new(callback: types.CallbackQuery):
 async def toggle_addr_changes(callback: types.CallbackQuery):
     addr_name = callback.data.replace("toggle_addr_changes_", "")
     user_id = callback.from_user.id
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     new_val = not settings['schedule_changes_enabled']
-    set_user_notification_settings(user_id, addr_name, settings['notifications_enabled'], settings['new_schedule_enabled'], new_val)
+    await run_write(set_user_notification_settings, user_id, addr_name, settings['notifications_enabled'], settings['new_schedule_enabled'], new_val)
     await callback.answer(f"Сповіщення про відновлення для '{addr_name}' {'увімкнено' if new_val else 'вимкнено'}")
 
     # Refresh the address settings menu
-    settings = get_user_notification_settings(user_id, addr_name)
+    settings = await run_read(get_user_notification_settings, user_id, addr_name)
     text = f"🏠 <b>Налаштування для адреси '{addr_name}'</b>\n\n"
     text += f"Сповіщення про відключення: {'✅ Увімкнено' if settings['notifications_enabled'] else '❌ Вимкнено'}\n"
     text += f"Можливе відключення: {'✅ Увімкнено' if settings['new_schedule_enabled'] else '❌ Вимкнено'}\n"
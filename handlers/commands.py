@@ -2,12 +2,16 @@ from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-import sqlite3
 from datetime import datetime, timedelta
 
 from formatting.keyboard_builder import get_queue_keyboard, get_main_menu
 from config.settings import ADMIN_USER_ID
 from core.states import BroadcastStates
+from utils.cpu_pool import get_cpu_metrics
+from utils.delivery import get_delivery_metrics, unblock_chat
+from utils.polling import get_poll_policy
+from database.connection import run_read
+from database.users import get_bot_stats
 
 router = Router()
 
@@ -15,6 +19,8 @@ router = Router()
 
 @router.message(Command("start"))
 async def cmd_start(message: types.Message):
+    # Користувач міг раніше заблокувати бота - знову дозволяємо розсилки
+    await unblock_chat(message.from_user.id)
     await message.answer("👋 <b>Вітаю!</b> Оберіть свою підчергу:", reply_markup=get_queue_keyboard(), parse_mode="HTML")
     await message.answer("Керування ботом 👇", reply_markup=get_main_menu())
 
@@ -33,38 +39,15 @@ async def cmd_stats(message: types.Message):
         await message.answer("❌ Доступ заборонено.")
         return
     
-    conn = sqlite3.connect('users.db')
-    cursor = conn.cursor()
-    
-    # Загальна статистика
-    cursor.execute('SELECT COUNT(DISTINCT user_id) FROM addresses')
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM addresses')
-    total_addresses = cursor.fetchone()[0]
-    
-    # Статистика по чергах
-    cursor.execute('SELECT subqueue, COUNT(*) FROM addresses GROUP BY subqueue ORDER BY subqueue')
-    subqueue_stats = cursor.fetchall()
-    
-    # Користувачі з налаштованими сповіщеннями
-    cursor.execute('SELECT COUNT(DISTINCT user_id) FROM user_notifications')
-    users_with_config = cursor.fetchone()[0]
-    
-    # Користувачі з увімкненими сповіщеннями
-    cursor.execute('SELECT COUNT(DISTINCT user_id) FROM user_notifications WHERE notifications_enabled = 1')
-    users_with_notifications = cursor.fetchone()[0]
-    
-    # Загальна кількість відправлених сповіщень
-    cursor.execute('SELECT COUNT(*) FROM sent_alerts')
-    total_alerts = cursor.fetchone()[0]
-    
-    # Сповіщення за останні 7 днів
-    cursor.execute('SELECT COUNT(*) FROM sent_alerts WHERE event_date >= ?', 
-                   ((datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),))
-    recent_alerts = cursor.fetchone()[0]
-    
-    conn.close()
+    # Статистика з бази (сповіщення - за останні 7 днів)
+    stats = await run_read(get_bot_stats, (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"))
+    total_users = stats['total_users']
+    total_addresses = stats['total_addresses']
+    subqueue_stats = stats['subqueue_stats']
+    users_with_config = stats['users_with_config']
+    users_with_notifications = stats['users_with_notifications']
+    total_alerts = stats['total_alerts']
+    recent_alerts = stats['recent_alerts']
     
     # Формуємо повідомлення
     stats_text = f"📊 <b>СТАТИСТИКА БОТА</b>\n\n"
@@ -80,9 +63,46 @@ async def cmd_stats(message: types.Message):
     stats_text += f"\n📨 <b>Сповіщення:</b>\n"
     stats_text += f"  Загалом: {total_alerts}\n"
     stats_text += f"  За 7 днів: {recent_alerts}\n"
+
+    d = get_delivery_metrics()
+    stats_text += f"\n🚚 <b>Доставка:</b>\n"
+    stats_text += f"  Надіслано: {d['sent']}, помилок: {d['failed']}, повторів: {d['retried']}\n"
+    stats_text += f"  Flood control: {d['rate_limited']}, заблокували бота: {d['blocked']}, пропущено: {d['skipped']}\n"
+    stats_text += f"  У черзі: {d['queued']}\n"
+    for lane, m in d['lanes'].items():
+        if m['sent'] or m['expired']:
+            avg_s = m['total_latency'] / m['sent'] if m['sent'] else 0
+            stats_text += f"  {lane}: {m['sent']} (прострочено {m['expired']}), затримка сер. {avg_s:.1f} с, макс. {m['max_latency']:.1f} с\n"
+
+    cpu_metrics = get_cpu_metrics()
+    if cpu_metrics:
+        stats_text += f"\n⚙️ <b>CPU задачі:</b>\n"
+        for name, m in cpu_metrics.items():
+            avg_ms = m['total_time'] / m['calls'] * 1000 if m['calls'] else 0
+            stats_text += f"  {name}: {m['calls']} (помилок {m['failures']}, таймаутів {m['timeouts']}), сер. {avg_ms:.0f} мс\n"
     
     await message.answer(stats_text, parse_mode="HTML")
 
+@router.message(Command("polling"))
+async def cmd_polling(message: types.Message):
+    if message.from_user.id != ADMIN_USER_ID:
+        await message.answer("❌ Доступ заборонено.")
+        return
+
+    p = get_poll_policy()
+    text = f"🛰 <b>ОПИТУВАННЯ САЙТУ</b>\n\n"
+    if p.get('mode'):
+        text += f"⏱ <b>Режим:</b> {p['mode']} ({p['reason']})\n"
+        text += f"  Інтервал: {p['interval']:.0f} с, наступна перевірка о {p['next_run']:%H:%M:%S}\n"
+    windows = ", ".join(f"{s // 60:02d}:{s % 60:02d}-{e // 60:02d}:{e % 60:02d}" for s, e in p['hot_windows'])
+    text += f"🔥 <b>Гарячі вікна:</b> {windows or 'немає'}\n"
+    text += f"📈 <b>Змін в історії:</b> {p['changes_recorded']}"
+    if p['last_change']:
+        text += f", остання {p['last_change']:%d.%m %H:%M}"
+    text += f"\n  Спостереження з {p['observed_since']:%d.%m.%Y}"
+
+    await message.answer(text, parse_mode="HTML")
+
 @router.message(Command("manual_schedule"))
 async def cmd_manual_schedule(message: types.Message, state: FSMContext):
     if message.from_user.id != ADMIN_USER_ID:
@@ -2,16 +2,19 @@ from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from database.addresses import get_user_addresses, update_address_name
-from database.users import get_user_subqueue
+from database.users import get_user_subqueue, get_all_user_ids
 from database.notifications import init_user_notification_settings, get_user_notification_settings
-import sqlite3
+from database.connection import run_read, run_write
 import asyncio
 import logging
 from datetime import datetime
+from functools import partial
 
 from formatting.keyboard_builder import get_queue_keyboard, get_main_menu
 from utils.schedule_sender import send_schedule_logic
-from utils.monitoring import parse_hoe_smart
+from utils.snapshot import get_snapshot_data, get_date_data
+from utils.file_ids import send_cached_photo, image_file_key
+from utils.delivery import deliver, PRIORITY_BROADCAST
 from core.states import AddressStates, BroadcastStates
 from core.globals import bot
 from config.settings import ADMIN_USER_ID
@@ -21,7 +24,7 @@ router = Router()
 @router.message(F.text == "📅 Графік на сьогодні")
 async def show_my_schedule(message: types.Message, state: FSMContext):
     await state.clear()
-    subq = get_user_subqueue(message.from_user.id)
+    subq = await run_read(get_user_subqueue, message.from_user.id)
     if not subq:
         await message.answer("Оберіть чергу 👇", reply_markup=get_queue_keyboard())
     else:
@@ -30,7 +33,7 @@ async def show_my_schedule(message: types.Message, state: FSMContext):
 @router.message(F.text == "🗓️ Графік на завтра")
 async def show_tomorrow_schedule(message: types.Message, state: FSMContext):
     await state.clear()
-    subq = get_user_subqueue(message.from_user.id)
+    subq = await run_read(get_user_subqueue, message.from_user.id)
     if not subq:
         await message.answer("Оберіть чергу 👇", reply_markup=get_queue_keyboard())
     else:
@@ -46,7 +49,7 @@ async def process_new_addr_name(message: types.Message, state: FSMContext):
     if not name:
         await message.answer("Назва не може бути порожньою.")
         return
-    addresses = get_user_addresses(message.from_user.id)
+    addresses = await run_read(get_user_addresses, message.from_user.id)
     if any(n == name for n, _, _ in addresses):
         await message.answer("Адреса з такою назвою вже існує.")
         return
@@ -68,18 +71,18 @@ async def process_edit_addr_name(message: types.Message, state: FSMContext):
     if not new_name:
         await message.answer("Назва не може бути порожньою.")
         return
-    addresses = get_user_addresses(message.from_user.id)
+    addresses = await run_read(get_user_addresses, message.from_user.id)
     if any(n == new_name for n, _, _ in addresses):
         await message.answer("Адреса з такою назвою вже існує.")
         return
-    update_address_name(message.from_user.id, old_name, new_name)
+    await run_write(update_address_name, message.from_user.id, old_name, new_name)
     await message.answer(f"✅ Назву адреси змінено з '{old_name}' на '{new_name}'.")
     await state.clear()
 
 @router.message(F.text == "🏠 Керування адресами")
 async def manage_addresses(message: types.Message, state: FSMContext):
     await state.clear()  # Зупиняємо будь-який процес
-    addresses = get_user_addresses(message.from_user.id)
+    addresses = await run_read(get_user_addresses, message.from_user.id)
     if not addresses:
         await message.answer("У вас немає адрес. Додайте першу адресу.")
         # Можливо, автоматично додати "Дім" але оскільки міграція вже зроблена, має бути
@@ -119,9 +122,9 @@ async def contact_dev(message: types.Message):
 async def bot_settings(message: types.Message, state: FSMContext):
     await state.clear()
     user_id = message.from_user.id
-    init_user_notification_settings(user_id)  # Ініціалізуємо налаштування, якщо не існують
+    await run_write(init_user_notification_settings, user_id)  # Ініціалізуємо налаштування, якщо не існують
     
-    addresses = get_user_addresses(user_id)
+    addresses = await run_read(get_user_addresses, user_id)
     if not addresses:
         await message.answer("У вас немає адрес. Спочатку додайте адресу в керуванні адресами.")
         return
@@ -134,7 +137,7 @@ async def bot_settings(message: types.Message, state: FSMContext):
     ])
     
     for name, _, _ in addresses:
-        settings = get_user_notification_settings(user_id, name)
+        settings = await run_read(get_user_notification_settings, user_id, name)
         status = "✅" if settings['notifications_enabled'] else "❌"
         kb.inline_keyboard.append([InlineKeyboardButton(text=f"🏠 {name} {status}", callback_data=f"toggle_addr_{name}")])
     
@@ -143,8 +146,8 @@ async def bot_settings(message: types.Message, state: FSMContext):
 @router.message(F.text == "📊 Загальний графік")
 async def act_general(message: types.Message, state: FSMContext):
     await state.clear()
-    # Надсилаємо загальний графік з сайту
-    all_data = await parse_hoe_smart()
+    # Надсилаємо загальний графік з останнього знімка сайту
+    all_data = get_snapshot_data()
     if not all_data:
         await message.answer("❌ Не вдалося отримати дані.")
         return
@@ -152,13 +155,13 @@ async def act_general(message: types.Message, state: FSMContext):
     # Спробуємо знайти графік на сьогодні
     now = datetime.now()
     current_date_str = now.strftime("%d.%m.%Y")
-    short_date = now.strftime("%d.%m.%y")
     
-    data = all_data.get(current_date_str) or all_data.get(short_date)
+    data = get_date_data(now)
     if data:
         img_url = data['img_url']
         try:
-            await bot.send_photo(message.from_user.id, photo=img_url, caption=f"📊 Загальний графік на {current_date_str}")
+            await send_cached_photo(message.from_user.id, image_file_key(img_url), lambda: img_url,
+                                    caption=f"📊 Загальний графік на {current_date_str}")
         except Exception as e:
             logging.error(f"Failed to send general schedule: {e}")
             await message.answer("❌ Помилка при відправці графіка.")
@@ -167,7 +170,8 @@ async def act_general(message: types.Message, state: FSMContext):
         for date_key, data in all_data.items():
             img_url = data['img_url']
             try:
-                await bot.send_photo(message.from_user.id, photo=img_url, caption=f"📊 Загальний графік на {date_key}")
+                await send_cached_photo(message.from_user.id, image_file_key(img_url), lambda: img_url,
+                                        caption=f"📊 Загальний графік на {date_key}")
                 break
             except Exception as e:
                 logging.error(f"Failed to send general schedule: {e}")
@@ -181,20 +185,14 @@ async def process_broadcast_message(message: types.Message, state: FSMContext):
     
     broadcast_text = message.text
     
-    conn = sqlite3.connect('users.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT DISTINCT user_id FROM addresses')
-    users = cursor.fetchall()
-    conn.close()
+    users = await run_read(get_all_user_ids)
     
-    sent_count = 0
-    for (uid,) in users:
-        try:
-            await bot.send_message(uid, broadcast_text, parse_mode="HTML")
-            sent_count += 1
-            await asyncio.sleep(0.1)  # Щоб не перевантажувати
-        except Exception as e:
-            logging.error(f"Failed to send to {uid}: {e}")
+    # Черга доставки сама тримає ліміти Telegram
+    # Розсилка йде найнижчим пріоритетом, сповіщення про відключення її обганяють
+    results = await asyncio.gather(*(deliver(uid, partial(bot.send_message, uid, broadcast_text, parse_mode="HTML"),
+                                             priority=PRIORITY_BROADCAST)
+                                     for uid in users))
+    sent_count = sum(results)
     
     await message.answer(f"✅ Повідомлення відправлено {sent_count} користувачам.")
     await state.clear()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import cv2
+import numpy as np
+from config.settings import TABLE_LAYOUT_CACHE_PATH
+
+# Bump when detection can give other bounds for the same image: OCR results cached by the old one are dropped
+GRID_DETECTOR_VERSION = 1
+
+# Offset (px) of the neighbours a grid line pixel is compared with, and the color difference that counts
+LINE_NEIGHBOUR_OFFSET = 3
+LINE_COLOR_DIFF = 20
+# Gaps between grid lines of one table may differ by this share of the mean gap
+MAX_GAP_SPREAD = 0.1
+# Layouts remembered per image size
+LAYOUTS_PER_SIZE = 4
+
+# Share of the image height hashed to recognize a layout where no grid was found
+NO_GRID_STRIP = 0.15
+
+# "WxH" -> [{'header': hash, 'bounds': {...} or None if no grid was found}, ...], loaded once per process
+_layouts = None
+
+def _read_layouts_file():
+    """Layouts stored on disk ({} if missing, broken or written by another detector version)"""
+    try:
+        if os.path.exists(TABLE_LAYOUT_CACHE_PATH):
+            with open(TABLE_LAYOUT_CACHE_PATH, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('version') == GRID_DETECTOR_VERSION:
+                return stored['layouts']
+    except Exception as e:
+        logging.error(f"Error loading table layout cache: {e}")
+    return {}
+
+def _load_layouts():
+    """Load detected layouts from file (once per process)"""
+    global _layouts
+    if _layouts is None:
+        _layouts = _read_layouts_file()
+    return _layouts
+
+def _save_layouts():
+    """
+    Save detected layouts. Every pool worker has its own copy, so entries on disk
+    that this process doesn't know are merged in first; then write a temp file and rename.
+    """
+    global _layouts
+    try:
+        merged = _read_layouts_file()
+        for size_key, known in _layouts.items():
+            headers = {layout['header'] for layout in known}
+            others = [layout for layout in merged.get(size_key, []) if layout['header'] not in headers]
+            merged[size_key] = (known + others)[:LAYOUTS_PER_SIZE]
+        _layouts = merged
+
+        cache_dir = os.path.dirname(TABLE_LAYOUT_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{TABLE_LAYOUT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': GRID_DETECTOR_VERSION, 'layouts': merged}, f)
+        os.replace(tmp_path, TABLE_LAYOUT_CACHE_PATH)
+    except Exception as e:
+        logging.error(f"Error saving table layout cache: {e}")
+
+def _line_positions(mask, axis, min_length):
+    """
+    Centers of lines in a line mask: extract long runs with morphology
+    (close small gaps at crossings, then open with a long kernel), project and group adjacent positions.
+    axis=0 - horizontal lines (y positions), axis=1 - vertical lines (x positions).
+    """
+    if axis == 0:
+        close_kernel, open_kernel = (7, 1), (min_length, 1)
+    else:
+        close_kernel, open_kernel = (1, 7), (1, min_length)
+    lines = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, close_kernel))
+    lines = cv2.morphologyEx(lines, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, open_kernel))
+    profile = (lines > 0).sum(axis=1 - axis)
+    hits = np.flatnonzero(profile > 2 * min_length)
+
+    positions = []
+    group = []
+    for pos in hits.tolist():
+        if group and pos - group[-1] > 1:
+            positions.append(sum(group) / len(group))
+            group = []
+        group.append(pos)
+    if group:
+        positions.append(sum(group) / len(group))
+    return positions
+
+def _equal_run(positions, count):
+    """(first, step) of the count + 1 consecutive lines with the most even spacing, or None"""
+    best = None
+    for i in range(len(positions) - count):
+        gaps = np.diff(positions[i:i + count + 1])
+        step = gaps.mean()
+        spread = (gaps.max() - gaps.min()) / step
+        if spread <= MAX_GAP_SPREAD and (best is None or spread < best[0]):
+            best = (spread, positions[i], step)
+    return best[1:] if best else None
+
+def detect_table_grid(img, rows, cols_options):
+    """
+    Find the schedule grid by its lines: pixels that differ in color from both neighbours
+    across the line direction, kept where they form long horizontal / vertical runs.
+    Returns bounds dict like load_table_bounds, or None if no evenly spaced grid of that size is found.
+    """
+    height, width = img.shape[:2]
+    pixels = img.astype(np.int16)
+    k = LINE_NEIGHBOUR_OFFSET
+
+    def differs(shift, axis):
+        return np.abs(pixels - np.roll(pixels, shift, axis)).max(axis=2) > LINE_COLOR_DIFF
+
+    horizontal = ((differs(k, 0) & differs(-k, 0)) * 255).astype(np.uint8)
+    vertical = ((differs(k, 1) & differs(-k, 1)) * 255).astype(np.uint8)
+
+    ys = _line_positions(horizontal, 0, max(width // 16, 10))
+    xs = _line_positions(vertical, 1, max(height // 16, 10))
+
+    row_run = _equal_run(ys, rows)
+    if row_run is None:
+        return None
+    for cols in cols_options:
+        col_run = _equal_run(xs, cols)
+        if col_run is not None:
+            break
+    else:
+        return None
+
+    (top, cell_height), (left, cell_width) = row_run, col_run
+    return {
+        'table_left': round(left),
+        'table_top': round(top),
+        'cell_width': float(cell_width),
+        'cell_height': float(cell_height),
+        'rows': rows,
+        'cols': cols,
+    }
+
+def _header_hash(img, bounds):
+    """Coarse hash of the strip above the table (hour labels): same strip = same layout"""
+    top = int(bounds['table_top'])
+    header_top = max(0, int(top - 2 * bounds['cell_height']))
+    left = int(bounds['table_left'])
+    right = int(left + bounds['cols'] * bounds['cell_width'])
+    strip = img[header_top:top, left:right]
+    if strip.size == 0:
+        return None
+    gray = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (bounds['cols'] * 4, 8), interpolation=cv2.INTER_AREA)
+    return hashlib.sha1(np.packbits(small < 160).tobytes()).hexdigest()[:16]
+
+def _top_strip_hash(img):
+    """Coarse hash of the top of the image, for layouts without a detected grid (no table position known)"""
+    strip = img[:max(1, int(img.shape[0] * NO_GRID_STRIP))]
+    gray = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (96, 8), interpolation=cv2.INTER_AREA)
+    return 'nogrid:' + hashlib.sha1(np.packbits(small < 160).tobytes()).hexdigest()[:16]
+
+def detect_table_bounds(img, rows, cols):
+    """
+    Table geometry for the image's layout: taken from the layout cache when the image size
+    and header strip match a known layout, otherwise detected and remembered.
+    Returns None if the grid can't be detected; that is remembered for the layout too.
+    """
+    height, width = img.shape[:2]
+    size_key = f"{width}x{height}"
+    layouts = _load_layouts()
+
+    top_hash = None
+    for layout in layouts.get(size_key, []):
+        if layout['bounds'] is None:
+            if top_hash is None:
+                top_hash = _top_strip_hash(img)
+            if top_hash == layout['header']:
+                return None
+        elif _header_hash(img, layout['bounds']) == layout['header']:
+            return dict(layout['bounds'])
+
+    cols_options = [cols] + [c for c in (24, 48) if c != cols]
+    bounds = detect_table_grid(img, rows, cols_options)
+
+    known = layouts.setdefault(size_key, [])
+    if bounds is None:
+        known.insert(0, {'header': top_hash or _top_strip_hash(img), 'bounds': None})
+        logging.info(f"No table grid found for {size_key} layout")
+    else:
+        known.insert(0, {'header': _header_hash(img, bounds), 'bounds': bounds})
+        logging.info(f"Detected table grid for {size_key} layout: {bounds}")
+    del known[LAYOUTS_PER_SIZE:]
+    _save_layouts()
+    return dict(bounds) if bounds is not None else None
@@ -1,37 +1,57 @@
 import cv2
 import numpy as np
 import json
+import logging
 import os
-
-def parse_table_colors(img):
-    """
-    Analyze table colors in schedule image.
-    Returns dict with schedule for each subqueue.
-    """
-    # Convert to HSV for better color analysis
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-
-    # Define color ranges based on test_schedule.png analysis
-    # Blue/cyan (no power) - RGB [143,170,220], HSV [109,89,220]
-    blue_lower = np.array([100, 50, 100])
-    blue_upper = np.array([120, 255, 255])
-
-    # Gray (possibly off) - RGB [224,224,224], HSV [0,0,224]
-    gray_lower = np.array([0, 0, 200])
-    gray_upper = np.array([180, 30, 250])
-
-    # White (power on) - RGB [255,255,255], HSV [0,0,255]
-    white_lower = np.array([0, 0, 250])
-    white_upper = np.array([180, 20, 255])
-
+from .grid_detection import detect_table_bounds
+from utils.slots import SLOTS_PER_DAY, slot_range, make_schedule
+
+# Cell statuses in the matrix returned by classify_table_cells
+STATUS_ON = 0        # power on
+STATUS_POSSIBLE = 1  # possibly off
+STATUS_OFF = 2       # no power
+
+# Define color ranges based on test_schedule.png analysis
+# Blue/cyan (no power) - RGB [143,170,220], HSV [109,89,220]
+BLUE_LOWER = np.array([100, 50, 100])
+BLUE_UPPER = np.array([120, 255, 255])
+
+# Gray (possibly off) - RGB [224,224,224], HSV [0,0,224]
+GRAY_LOWER = np.array([0, 0, 200])
+GRAY_UPPER = np.array([180, 30, 250])
+
+# White (power on) - RGB [255,255,255], HSV [0,0,255]
+WHITE_LOWER = np.array([0, 0, 250])
+WHITE_UPPER = np.array([180, 20, 255])
+
+# Pixels trimmed from each side of a cell to skip grid lines
+CELL_MARGIN = 3
+# Minimal share of the dominant color for a cell to count as colored
+DOMINANT_RATIO = 0.3
+
+# Parsed table_bounds.json ({} if missing or broken), read once per process
+_bounds_settings = None
+
+def _load_bounds_settings():
+    global _bounds_settings
+    if _bounds_settings is None:
+        _bounds_settings = {}
+        try:
+            if os.path.exists('table_bounds.json'):
+                with open('table_bounds.json', 'r') as f:
+                    _bounds_settings = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading table_bounds.json: {e}")
+    return _bounds_settings
+
+def load_table_bounds(img):
+    """Get table geometry for image: table_bounds.json or proportional defaults"""
     height, width = img.shape[:2]
 
     # Load table settings
     try:
-        settings_path = 'table_bounds.json'
-        if os.path.exists(settings_path):
-            with open(settings_path, 'r') as f:
-                settings = json.load(f)
+        settings = _load_bounds_settings()
+        if settings:
             table_left = settings.get('table_left', int(width * 0.05))
             table_right = settings.get('table_right', int(width * 0.95))
             table_top = settings.get('table_top', int(height * 0.15))
@@ -53,66 +73,141 @@ def parse_table_colors(img):
         cell_height = (table_bottom - table_top) // rows
         cell_width = (table_right - table_left) // cols
 
+    return {
+        'table_left': table_left,
+        'table_top': table_top,
+        'cell_width': cell_width,
+        'cell_height': cell_height,
+        'rows': rows,
+        'cols': cols,
+    }
+
+def get_table_bounds(img):
+    """Get table geometry for image: detected grid (cached per layout), table_bounds.json if detection fails"""
+    configured = load_table_bounds(img)
+    bounds = detect_table_bounds(img, configured['rows'], configured['cols'])
+    if bounds is None:
+        logging.warning("Table grid not detected, using table_bounds.json")
+        return configured
+    return bounds
+
+def _cell_edges(start, cell_size, count, limit):
+    """Start/end pixel of the central part of each cell, clipped to the image like slicing does"""
+    # Detected cell sizes are fractional: round every edge, so the error doesn't add up across the table
+    edges = np.round(start + np.arange(count + 1) * cell_size).astype(np.int64)
+    starts = edges[:-1] + CELL_MARGIN
+    ends = edges[1:] - CELL_MARGIN
+    starts = np.clip(starts, 0, limit)
+    ends = np.clip(ends, 0, limit)
+    return starts, np.maximum(ends, starts)
+
+def _count_per_cell(mask, y1, y2, x1, x2):
+    """Count non-zero mask pixels in every cell at once using an integral image"""
+    # inRange masks are 0/255; int32 sums are exact while they fit
+    sdepth = cv2.CV_32S if mask.size * 255 < 2**31 else cv2.CV_64F
+    integral = cv2.integral(mask, sdepth=sdepth)
+    sums = (integral[y2[:, None], x2[None, :]] - integral[y1[:, None], x2[None, :]]
+            - integral[y2[:, None], x1[None, :]] + integral[y1[:, None], x1[None, :]])
+    return sums.astype(np.int64) // 255
+
+def classify_table_cells(img, bounds=None, with_confidence=False):
+    """
+    Classify every table cell with one HSV conversion and one mask per color.
+    Returns rows x cols matrix of STATUS_ON / STATUS_POSSIBLE / STATUS_OFF;
+    with_confidence=True returns (status, confidence), see _cell_confidence.
+    """
+    if bounds is None:
+        bounds = get_table_bounds(img)
+    height, width = img.shape[:2]
+    rows, cols = bounds['rows'], bounds['cols']
+
+    y1, y2 = _cell_edges(bounds['table_top'], bounds['cell_height'], rows, height)
+    x1, x2 = _cell_edges(bounds['table_left'], bounds['cell_width'], cols, width)
+
+    status = np.full((rows, cols), STATUS_ON, dtype=np.int8)
+
+    # Convert only the part of the image the cells actually cover
+    top, bottom = int(y1.min()), int(y2.max())
+    left, right = int(x1.min()), int(x2.max())
+    if bottom <= top or right <= left:
+        return (status, np.zeros((rows, cols))) if with_confidence else status
+    hsv = cv2.cvtColor(img[top:bottom, left:right], cv2.COLOR_BGR2HSV)
+    y1, y2 = y1 - top, y2 - top
+    x1, x2 = x1 - left, x2 - left
+
+    # Order matters: on a tie blue wins over gray, gray over white
+    counts = np.stack([
+        _count_per_cell(cv2.inRange(hsv, BLUE_LOWER, BLUE_UPPER), y1, y2, x1, x2),
+        _count_per_cell(cv2.inRange(hsv, GRAY_LOWER, GRAY_UPPER), y1, y2, x1, x2),
+        _count_per_cell(cv2.inRange(hsv, WHITE_LOWER, WHITE_UPPER), y1, y2, x1, x2),
+    ])
+    total = (y2 - y1)[:, None] * (x2 - x1)[None, :]
+
+    dominant = counts.argmax(axis=0)
+    colored = counts.max(axis=0) > DOMINANT_RATIO * total
+
+    status[colored & (dominant == 0)] = STATUS_OFF
+    status[colored & (dominant == 1)] = STATUS_POSSIBLE
+    if with_confidence:
+        return status, _cell_confidence(counts, total, colored)
+    return status
+
+def _cell_confidence(counts, total, colored):
+    """
+    How far each cell is from being classified differently, as a share of its pixels:
+    for a colored cell - distance of the dominant color to the runner-up and to DOMINANT_RATIO,
+    for an uncolored one - distance of the strongest color to DOMINANT_RATIO.
+    """
+    shares = counts / np.maximum(total, 1)
+    ordered = np.sort(shares, axis=0)
+    top, second = ordered[-1], ordered[-2]
+    return np.where(colored, np.minimum(top - second, top - DOMINANT_RATIO), DOMINANT_RATIO - top)
+
+def _row_mask(row_status, value):
+    """Slot mask of the cells in a row with the given status (each column covers an equal part of the day)"""
+    slots_per_col = SLOTS_PER_DAY // len(row_status)
+    mask = 0
+    for col in np.flatnonzero(row_status == value).tolist():
+        mask |= slot_range(col * slots_per_col, (col + 1) * slots_per_col)
+    return mask
+
+def cells_to_schedules(status):
+    """Convert status matrix to {subqueue: DaySchedule}, leaving out subqueues without outages"""
     schedules = {}
 
-    for row in range(rows):
+    for row in range(status.shape[0]):
         subqueue = f"{row//2 + 1}.{row%2 + 1}"  # 1.1, 1.2, 2.1, 2.2, ...
-        intervals_off = []  # guaranteed outages
-        intervals_possible = []  # possible outages
-
-        for col in range(cols):
-            x1 = table_left + col * cell_width
-            y1 = table_top + row * cell_height
-            x2 = x1 + cell_width
-            y2 = y1 + cell_height
-
-            # Take central part of cell
-            margin = 3
-            cell_roi = img[y1+margin:y2-margin, x1+margin:x2-margin]
-            if cell_roi.size == 0:
-                continue
-
-            # Convert to HSV
-            hsv_cell = cv2.cvtColor(cell_roi, cv2.COLOR_BGR2HSV)
-
-            # Count pixels of each color
-            blue_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, blue_lower, blue_upper))
-            gray_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, gray_lower, gray_upper))
-            white_pixels = cv2.countNonZero(cv2.inRange(hsv_cell, white_lower, white_upper))
-
-            total_pixels = cell_roi.size // 3
-
-            # Determine dominant color
-            max_pixels = max(blue_pixels, gray_pixels, white_pixels)
-
-            if max_pixels / total_pixels > 0.3:  # more than 30% of pixels this color
-                if blue_pixels == max_pixels:
-                    status = "off"  # no power
-                elif gray_pixels == max_pixels:
-                    status = "possible"  # possibly off
-                else:
-                    status = "on"  # power on
-            else:
-                status = "on"  # default
-
-            # Add intervals
-            if status == "off":
-                start_hour = col
-                end_hour = col + 1
-                intervals_off.append(f"{start_hour:02d}:00-{end_hour:02d}:00")
-            elif status == "possible":
-                start_hour = col
-                end_hour = col + 1
-                intervals_possible.append(f"{start_hour:02d}:00-{end_hour:02d}:00")
-
-        # Form schedule text
-        schedule_parts = []
-        if intervals_off:
-            schedule_parts.append("Вимкнено: " + ", ".join(intervals_off))
-        if intervals_possible:
-            schedule_parts.append("Можливо вимкнено: " + ", ".join(intervals_possible))
-
-        if schedule_parts:
-            schedules[subqueue] = "; ".join(schedule_parts)
-
-    return schedules
\ No newline at end of file
+        schedule = make_schedule(_row_mask(status[row], STATUS_OFF), _row_mask(status[row], STATUS_POSSIBLE))
+        if schedule:
+            schedules[subqueue] = schedule
+
+    return schedules
+
+def parse_table_colors(img):
+    """
+    Analyze table colors in schedule image.
+    Returns {subqueue: DaySchedule}.
+    """
+    return cells_to_schedules(classify_table_cells(img))
+
+def cells_to_uncertain(confidence, margin):
+    """Convert confidence matrix to {subqueue: slot mask of cells read with confidence below margin}"""
+    uncertain = {}
+
+    for row in range(confidence.shape[0]):
+        mask = _row_mask(confidence[row] < margin, True)
+        if mask:
+            uncertain[f"{row//2 + 1}.{row%2 + 1}"] = mask
+
+    return uncertain
+
+def parse_image_bytes(image_data, margin=0.0):
+    """
+    Decode image bytes and analyze table colors (runs in the CPU pool).
+    Returns ({subqueue: DaySchedule}, {subqueue: uncertain slot mask}), or None if the image can't be decoded.
+    """
+    img = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    status, confidence = classify_table_cells(img, with_confidence=True)
+    return cells_to_schedules(status), cells_to_uncertain(confidence, margin)
\ No newline at end of file
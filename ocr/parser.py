@@ -1,5 +1,6 @@
 import asyncio
-import aiohttp
+import hashlib
+import io
 import logging
 import cv2
 import numpy as np
@@ -7,22 +8,22 @@ from PIL import Image, ImageDraw, ImageFont
 import math
 import os
 from datetime import datetime, timedelta, timezone
-from .image_processing import parse_table_colors
-from utils.helpers import parse_schedule_to_intervals
+from .image_processing import parse_table_colors, parse_image_bytes
+from .result_cache import get_cache_key, get_cached_result, store_result
+from utils.slots import SLOT_MINUTES, iter_ranges
 
 async def parse_schedule_image(image_path_or_url):
     """
     Parse schedule from image.
-    Returns dict {subqueue: schedule_text}
+    Returns dict {subqueue: DaySchedule}
     """
     try:
         # Load image
         if image_path_or_url.startswith('http'):
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_path_or_url) as response:
-                    image_data = await response.read()
-                    nparr = np.frombuffer(image_data, np.uint8)
-                    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            from utils.http_client import get_session
+            async with get_session().get(image_path_or_url) as response:
+                image_data = await response.read()
+            return await parse_schedule_bytes(image_data)
         else:
             img = cv2.imread(image_path_or_url)
 
@@ -46,30 +47,90 @@ async def parse_schedule_image(image_path_or_url):
         logging.error(f"OCR parsing error: {e}")
         return {}
 
-def generate_clock_image(subqueue, schedule_text, date_info=""):
+async def read_schedule_bytes(image_data):
     """
-    Create clock image with outages
-    schedule_text: combined schedule text like "Вимкнено: 01:00-02:00; Можливо вимкнено: 03:00-04:00"
+    Parse schedule from already downloaded image bytes.
+    Results are cached by content hash, so an unchanged image costs one hash;
+    decoding and OCR run in the CPU pool, off the event loop.
+    Returns ({subqueue: DaySchedule}, {subqueue: slot mask of cells read with low confidence})
     """
-    # Create clock image
-    os.makedirs('clocks', exist_ok=True)
-    filename = f"clocks/{subqueue}_{date_info.replace('.', '_')}.png"
+    try:
+        from utils.cpu_pool import run_cpu
+        from config.settings import OCR_CONFIDENCE_MARGIN
+
+        cache_key = get_cache_key(image_data)
+        result = get_cached_result(cache_key)
+        if result is not None:
+            logging.info("OCR result cache hit")
+            return result
+
+        result = await run_cpu(parse_image_bytes, image_data, OCR_CONFIDENCE_MARGIN)
+        if result is None:
+            logging.error("Failed to decode image bytes")
+            return {}, {}
+        schedules, uncertain = result
+        if schedules:
+            store_result(cache_key, schedules, uncertain)
+        return schedules, uncertain
+    except Exception as e:
+        logging.error(f"OCR parsing error: {e}")
+        return {}, {}
 
-    # Clean old files (older than 24 hours) on each call
+async def parse_schedule_bytes(image_data):
+    """
+    Parse schedule from already downloaded image bytes.
+    Returns dict {subqueue: DaySchedule}
+    """
+    schedules, _ = await read_schedule_bytes(image_data)
+    return schedules
+
+def cleanup_old_clocks():
+    """Remove clock images older than 24 hours"""
+    if not os.path.isdir('clocks'):
+        return
     now = datetime.now()
     for file in os.listdir('clocks'):
         filepath = os.path.join('clocks', file)
-        if os.path.isfile(filepath):
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-            if (now - file_mtime).total_seconds() > 86400:  # 24 hours
-                os.remove(filepath)
+        try:
+            if os.path.isfile(filepath):
+                file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
+                if (now - file_mtime).total_seconds() > 86400:  # 24 hours
+                    os.remove(filepath)
+        except OSError:
+            continue
 
-    size = 600
+CLOCK_SIZE = 600
+CLOCK_RADIUS = 250
+
+# Per-process caches: the font and the static clock face never change
+_clock_font = None
+_clock_base = None
+
+def _get_clock_font():
+    """Load the hour label font once per process"""
+    global _clock_font
+    if _clock_font is None:
+        # Try to load font
+        try:
+            _clock_font = ImageFont.truetype('arial.ttf', 32)
+        except:
+            try:
+                _clock_font = ImageFont.truetype('/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf', 32)
+            except:
+                try:
+                    _clock_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 32)
+                except:
+                    _clock_font = ImageFont.load_default()
+    return _clock_font
+
+def _render_clock_base():
+    """Render the static clock face: background, gradient, outer circle, hour marks and labels"""
+    size = CLOCK_SIZE
     img = Image.new('RGBA', (size, size), (220, 220, 220, 255))  # Light gray background
     draw = ImageDraw.Draw(img)
 
     center = size // 2
-    radius = 250
+    radius = CLOCK_RADIUS
 
     # Clock background with gradient
     for r in range(radius, 0, -1):
@@ -81,17 +142,7 @@ def generate_clock_image(subqueue, schedule_text, date_info=""):
     draw.ellipse((center - radius, center - radius, center + radius, center + radius),
                  outline=(100, 100, 100), width=3)
 
-    # Try to load font
-    try:
-        font = ImageFont.truetype('arial.ttf', 32)
-    except:
-        try:
-            font = ImageFont.truetype('/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf', 32)
-        except:
-            try:
-                font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 32)
-            except:
-                font = ImageFont.load_default()
+    font = _get_clock_font()
 
     # Hour marks
     for hour in range(24):
@@ -122,14 +173,49 @@ def generate_clock_image(subqueue, schedule_text, date_info=""):
             # Main text white
             draw.text((cx, cy), str(hour), fill=(255, 255, 255), font=font)
 
-    # Parse outage intervals from combined text
-    intervals = parse_schedule_to_intervals(schedule_text)
+    return img
+
+def _get_clock_base():
+    """Static clock face, rendered once per process"""
+    global _clock_base
+    if _clock_base is None:
+        _clock_base = _render_clock_base()
+    return _clock_base
+
+def get_schedule_hash(schedule):
+    """Short content hash of a DaySchedule, identifies its clock schedule layer"""
+    return hashlib.sha1(f"{schedule.guaranteed:012x}:{schedule.possible:012x}".encode('ascii')).hexdigest()[:12]
+
+def get_clock_layer_path(subqueue, schedule, date_info=""):
+    """Path of the schedule layer for (date, subqueue, schedule hash)"""
+    return f"clocks/{subqueue}_{date_info.replace('.', '_')}_{get_schedule_hash(schedule)}.png"
+
+def generate_clock_image(subqueue, schedule, date_info=""):
+    """
+    Create the schedule layer of a clock: cached face + outage arcs, without the time hand
+    (runs in the CPU pool, see utils.cpu_pool). The hand is added on send by compose_clock_with_hand.
+    Layers are cached on disk per (date, subqueue, schedule hash); an existing one is not redrawn.
+    schedule: DaySchedule of the subqueue for that date
+    """
+    os.makedirs('clocks', exist_ok=True)
+    filename = get_clock_layer_path(subqueue, schedule, date_info)
+    if os.path.exists(filename):
+        return filename
+
+    img = _get_clock_base().copy()
+    draw = ImageDraw.Draw(img)
+
+    center = CLOCK_SIZE // 2
+    radius = CLOCK_RADIUS
+
+    # Degrees of the 24-hour dial per half-hour slot
+    slot_angle = SLOT_MINUTES / 60 * 15
 
     # Guaranteed outages - red
-    for start_hour, end_hour in intervals['guaranteed']:
+    for start_slot, end_slot in iter_ranges(schedule.guaranteed):
         try:
-            start_angle = (start_hour * 15) - 90
-            end_angle = (end_hour * 15) - 90
+            start_angle = (start_slot * slot_angle) - 90
+            end_angle = (end_slot * slot_angle) - 90
 
             if end_angle < start_angle:
                 end_angle += 360
@@ -144,10 +230,10 @@ def generate_clock_image(subqueue, schedule_text, date_info=""):
             continue
 
     # Possible outages - gray
-    for start_hour, end_hour in intervals['possible']:
+    for start_slot, end_slot in iter_ranges(schedule.possible):
         try:
-            start_angle = (start_hour * 15) - 90
-            end_angle = (end_hour * 15) - 90
+            start_angle = (start_slot * slot_angle) - 90
+            end_angle = (end_slot * slot_angle) - 90
 
             if end_angle < start_angle:
                 end_angle += 360
@@ -161,30 +247,43 @@ def generate_clock_image(subqueue, schedule_text, date_info=""):
         except:
             continue
 
-    # Draw current time hand (30 minutes ahead as requested)
+    # Write to a temp name first so a parallel reader never sees a half-written layer
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    # Drawing is cheap now; default zlib level would make PNG encoding most of the cost
+    img.save(tmp_filename, format='PNG', compress_level=3)
+    os.replace(tmp_filename, filename)
+    return filename
+
+def get_clock_hand_hour():
+    """Current Kyiv hour; the hand always points at HH:30 of it"""
     # Use Kyiv timezone (Europe/Kiev)
-    kyiv_tz = timezone(timedelta(hours=2))  # UTC+2 for winter time, UTC+3 for summer
-    # For more accurate timezone handling, we could use pytz if available
     try:
         import pytz
         kyiv_tz = pytz.timezone('Europe/Kiev')
     except ImportError:
         # Fallback to manual offset (will need to be updated for daylight saving)
         kyiv_tz = timezone(timedelta(hours=2))  # Assuming winter time
-    
-    current_time = datetime.now(kyiv_tz)
-    # Take current hour, ignore minutes, add 30 minutes
-    display_hour = current_time.hour
+    return datetime.now(kyiv_tz).hour
+
+# hour -> transparent layer with the time hand, per process
+_hand_layers = {}
+
+def _get_hand_layer(hour):
+    """Transparent overlay with the time hand pointing at hour:30"""
+    layer = _hand_layers.get(hour)
+    if layer is not None:
+        return layer
+
+    layer = Image.new('RGBA', (CLOCK_SIZE, CLOCK_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    center = CLOCK_SIZE // 2
     display_minute = 30  # Always show :30
-    
-    # Debug: print time being used
-    logging.info(f"Clock time hand: current Kyiv time {current_time.strftime('%H:%M:%S')} -> display {display_hour:02d}:{display_minute:02d}")
 
     # Calculate angle for display time (15 degrees per hour, 0.25 degrees per minute)
-    time_angle = math.radians((display_hour * 15 + display_minute * 0.25) - 90)
+    time_angle = math.radians((hour * 15 + display_minute * 0.25) - 90)
 
     # Draw time hand
-    hand_length = radius - 80  # Shorter than hour marks
+    hand_length = CLOCK_RADIUS - 80  # Shorter than hour marks
     hand_x = center + hand_length * math.cos(time_angle)
     hand_y = center + hand_length * math.sin(time_angle)
 
@@ -199,6 +298,16 @@ def generate_clock_image(subqueue, schedule_text, date_info=""):
     draw.ellipse((center - 8, center - 8, center + 8, center + 8), fill=(0, 150, 255))
     draw.ellipse((center - 4, center - 4, center + 4, center + 4), fill=(255, 255, 255))
 
-    # Save image
-    img.save(filename)
-    return filename
\ No newline at end of file
+    _hand_layers[hour] = layer
+    return layer
+
+def compose_clock_with_hand(layer_path, hour):
+    """
+    Composite the time hand for hour onto a schedule layer (runs in the CPU pool).
+    Returns PNG bytes ready to be sent.
+    """
+    with Image.open(layer_path) as layer:
+        img = Image.alpha_composite(layer.convert('RGBA'), _get_hand_layer(hour))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=3)
+    return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from config.settings import OCR_CACHE_PATH, OCR_CACHE_SIZE, OCR_CONFIDENCE_MARGIN
+from utils.slots import as_schedule
+from .grid_detection import GRID_DETECTOR_VERSION
+
+TABLE_BOUNDS_PATH = 'table_bounds.json'
+
+# Contents of table_bounds.json (b'' if missing), read once per process like image_processing does
+_bounds_config = None
+
+# key -> ({subqueue: DaySchedule}, {subqueue: uncertain slot mask}), least recently used first
+_results = None
+
+def _load_results():
+    """Load persisted OCR results from file (once per process)"""
+    global _results
+    if _results is None:
+        _results = OrderedDict()
+        try:
+            if os.path.exists(OCR_CACHE_PATH):
+                with open(OCR_CACHE_PATH, 'r', encoding='utf-8') as f:
+                    for key, result in json.load(f):
+                        # Entries written before the stability filter hold only the schedules
+                        schedules, uncertain = (result, {}) if isinstance(result, dict) else result
+                        _results[key] = ({subqueue: as_schedule(value) for subqueue, value in schedules.items()}, uncertain)
+                logging.info(f"Loaded {len(_results)} cached OCR results")
+        except Exception as e:
+            logging.error(f"Error loading OCR result cache: {e}")
+            _results = OrderedDict()
+    return _results
+
+def _save_results():
+    """Save OCR results to file, keeping LRU order"""
+    try:
+        cache_dir = os.path.dirname(OCR_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(OCR_CACHE_PATH, 'w', encoding='utf-8') as f:
+            # DaySchedule is a tuple, so it is written as [guaranteed, possible]
+            json.dump(list(_results.items()), f, ensure_ascii=False)
+    except Exception as e:
+        logging.error(f"Error saving OCR result cache: {e}")
+
+def _bounds_fingerprint():
+    """Fallback table bounds config (read once per process); geometry is otherwise detected per image"""
+    global _bounds_config
+    if _bounds_config is None:
+        try:
+            with open(TABLE_BOUNDS_PATH, 'rb') as f:
+                _bounds_config = f.read()
+        except OSError:
+            _bounds_config = b''
+    return _bounds_config
+
+def get_cache_key(image_data):
+    """
+    Content address of an OCR result: hash of image bytes + what decides the geometry
+    (grid detector version, fallback bounds config) + confidence margin
+    """
+    digest = hashlib.sha256(image_data)
+    digest.update(f"\0grid{GRID_DETECTOR_VERSION}\0".encode('ascii'))
+    digest.update(_bounds_fingerprint())
+    digest.update(f"\0{OCR_CONFIDENCE_MARGIN}".encode('ascii'))
+    return digest.hexdigest()
+
+def get_cached_result(key):
+    """Get cached OCR result (schedules, uncertain) for key, or None"""
+    results = _load_results()
+    result = results.get(key)
+    if result is None:
+        return None
+    results.move_to_end(key)
+    return dict(result[0]), dict(result[1])
+
+def store_result(key, schedules, uncertain):
+    """Store OCR result, evicting the least recently used entries over the limit"""
+    results = _load_results()
+    results[key] = (dict(schedules), dict(uncertain))
+    results.move_to_end(key)
+    while len(results) > OCR_CACHE_SIZE:
+        results.popitem(last=False)
+    _save_results()
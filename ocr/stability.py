@@ -0,0 +1,68 @@
+import logging
+from config.settings import OCR_STABLE_READS
+from utils.slots import EMPTY_SCHEDULE, SLOT_OFF, SLOT_POSSIBLE, iter_slots, make_schedule, slot_state
+
+# date_key -> {(subqueue, slot): (read state, consecutive reads)} of uncertain slots
+# that read differently from the published schedule and wait for confirmation
+_pending = {}
+
+def has_pending_changes():
+    """True while some uncertain slot change waits for more reads"""
+    return any(_pending.values())
+
+def prune_pending(date_keys):
+    """Forget pending changes of dates that are no longer on the site"""
+    for date_key in list(_pending):
+        if date_key not in date_keys:
+            del _pending[date_key]
+
+def stabilize(date_key, schedules, uncertain, published):
+    """
+    Filter one OCR reading of date_key against the published {subqueue: DaySchedule}.
+    A slot that reads differently from the published schedule is taken at once if its cell
+    was read with confidence, otherwise only after OCR_STABLE_READS consecutive reads of the same state.
+    published=None (nothing to compare with) takes the reading as is.
+    Returns {subqueue: DaySchedule} to publish, subqueues without outages left out.
+    """
+    if published is None:
+        _pending.pop(date_key, None)
+        return dict(schedules)
+
+    pending = _pending.get(date_key, {})
+    still_pending = {}
+    result = {}
+    for subqueue in schedules.keys() | published.keys():
+        read = schedules.get(subqueue, EMPTY_SCHEDULE)
+        current = published.get(subqueue, EMPTY_SCHEDULE)
+        differ = (read.guaranteed ^ current.guaranteed) | (read.possible ^ current.possible)
+        doubtful = differ & uncertain.get(subqueue, 0)
+
+        # Confident slots come from the reading, doubtful ones keep the published state for now
+        guaranteed = (read.guaranteed & ~doubtful) | (current.guaranteed & doubtful)
+        possible = (read.possible & ~doubtful) | (current.possible & doubtful)
+
+        for slot in iter_slots(doubtful):
+            state = slot_state(read, slot)
+            seen = pending.get((subqueue, slot))
+            reads = seen[1] + 1 if seen and seen[0] == state else 1
+            if reads < OCR_STABLE_READS:
+                still_pending[(subqueue, slot)] = (state, reads)
+                continue
+            bit = 1 << slot
+            guaranteed &= ~bit
+            possible &= ~bit
+            if state == SLOT_OFF:
+                guaranteed |= bit
+            elif state == SLOT_POSSIBLE:
+                possible |= bit
+
+        schedule = make_schedule(guaranteed, possible)
+        if schedule:
+            result[subqueue] = schedule
+
+    if still_pending:
+        _pending[date_key] = still_pending
+        logging.info(f"OCR for {date_key}: {len(still_pending)} uncertain slot changes wait for confirmation")
+    else:
+        _pending.pop(date_key, None)
+    return result
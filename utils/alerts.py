@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+from config.settings import ALERT_LEAD_MINUTES
+
+# Prefix of one-shot alert job ids in the scheduler
+ALERT_JOB_PREFIX = "alert:"
+# Alert jobs that already ran (job id -> event time), so a later store change doesn't schedule them again
+_fired = {}
+
+def _alert_title(status_now, status_future):
+    """Alert text for a transition, empty if the transition is not worth a message"""
+    if status_now == 'white' and status_future == 'grey': return "⚠️ <b>МОЖЛИВЕ ВІДКЛЮЧЕННЯ</b>"
+    if status_now == 'white' and status_future == 'black': return "⚠️ <b>ВІДКЛЮЧЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
+    if status_now == 'black' and status_future == 'white': return "✅ <b>ВІДНОВЛЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
+    if status_now == 'grey' and status_future == 'black': return "⚠️ <b>ГАРАНТОВАНЕ ВІДКЛЮЧЕННЯ</b>"
+    if status_now != 'white' and status_future == 'white': return "✅ <b>ВІДНОВЛЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
+    return ""
+
+async def send_transition_alert(subqueue, event_ts, status_now, status_future):
+    """Надсилає сповіщення про перехід статусу підчерги, групуючи адреси користувача"""
+    title = _alert_title(status_now, status_future)
+    if not title:
+        return
+    logging.info(f"Sending alert for {subqueue} at {event_ts:%d.%m %H:%M}: {status_now} -> {status_future}")
+    try:
+        from database.notifications import get_notification_audience, filter_unsent_alerts, record_sent_alerts
+        from database.connection import run_read, run_write
+        from core.globals import bot
+        from utils.delivery import deliver, PRIORITY_ALERT
+
+        e_time = event_ts.strftime("%H:%M")
+        e_date = event_ts.strftime("%Y-%m-%d")
+        e_type = f"{status_now}-{status_future}"
+
+        # 1. Збираємо адреси цієї підчерги, про які ще не сповіщали: uid -> set of address_names
+        audience = await run_read(get_notification_audience)
+        keys = [(uid, e_date, e_time, e_type, addr_name) for uid, addr_name in audience.get(subqueue, [])]
+        user_addrs = {}
+        for uid, _, _, _, addr_name in await run_read(filter_unsent_alerts, keys):
+            user_addrs.setdefault(uid, set()).add(addr_name)
+
+        # 2. Відправка згрупованих сповіщень
+        async def deliver_alert(uid, addrs):
+            addr_str = ", ".join(sorted(addrs))
+            full_message = f"{title}\n\nОрієнтовно о {e_time}\nАдреса: <b>{addr_str}</b>"
+
+            # Після настання події сповіщення вже не потрібне
+            return await deliver(uid, partial(bot.send_message, uid, full_message, parse_mode="HTML"),
+                                 priority=PRIORITY_ALERT, deadline=event_ts)
+
+        user_ids = list(user_addrs)
+        results = await asyncio.gather(*(deliver_alert(uid, user_addrs[uid]) for uid in user_ids))
+
+        # 3. Історія надісланих - одним записом на весь прогін
+        sent_keys = [(uid, e_date, e_time, e_type, addr_name)
+                     for uid, delivered in zip(user_ids, results) if delivered
+                     for addr_name in user_addrs[uid]]
+        await run_write(record_sent_alerts, sent_keys)
+        logging.info(f"Sent {sum(results)} alerts for {subqueue}")
+    except Exception as e:
+        logging.error(f"Error in notifications: {e}")
+
+async def _run_alert_job(job_id, subqueue, event_ts, status_now, status_future):
+    _fired[job_id] = event_ts
+    await send_transition_alert(subqueue, event_ts, status_now, status_future)
+
+async def prune_alert_history():
+    """Delete old notification history (daily job)"""
+    from database.connection import run_write
+    from database.notifications import prune_sent_alerts
+    try:
+        deleted = await run_write(prune_sent_alerts)
+        logging.info(f"Pruned {deleted} old sent alerts")
+    except Exception as e:
+        logging.error(f"Error pruning sent alerts: {e}")
+
+def schedule_alert_jobs():
+    """
+    Register one one-shot job per upcoming transition, ALERT_LEAD_MINUTES before it.
+    Called on every schedule store change: jobs of transitions that no longer exist are removed,
+    the rest are (re)placed at their exact fire time.
+    """
+    from core.globals import scheduler
+    from utils.timeline import get_all_transitions
+
+    now = datetime.now()
+    lead = timedelta(minutes=ALERT_LEAD_MINUTES)
+    wanted = {}
+    for subqueue, transitions in get_all_transitions().items():
+        for event_ts, status_now, status_future in transitions:
+            if event_ts <= now or not _alert_title(status_now, status_future):
+                continue
+            job_id = f"{ALERT_JOB_PREFIX}{subqueue}:{event_ts:%Y%m%d%H%M}:{status_now}:{status_future}"
+            if job_id in _fired:
+                continue
+            # Transition closer than the lead time (schedule published late): alert right away
+            wanted[job_id] = (max(event_ts - lead, now), (subqueue, event_ts, status_now, status_future))
+
+    existing = {job.id for job in scheduler.get_jobs() if job.id.startswith(ALERT_JOB_PREFIX)}
+    for job_id in existing - wanted.keys():
+        scheduler.remove_job(job_id)
+    for job_id in wanted.keys() - existing:
+        run_date, args = wanted[job_id]
+        scheduler.add_job(_run_alert_job, 'date', run_date=run_date, args=(job_id,) + args, id=job_id,
+                          misfire_grace_time=int(lead.total_seconds()))
+    # Forget fired jobs of past events
+    for job_id in [j for j, event_ts in _fired.items() if event_ts <= now]:
+        del _fired[job_id]
+    logging.info(f"Alert jobs: {len(wanted)} scheduled, {len(wanted.keys() - existing)} added, {len(existing - wanted.keys())} removed")
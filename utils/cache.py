@@ -1,75 +1,220 @@
+import hashlib
 import json
 import logging
 import os
-from config.settings import CACHE_PATH
+from collections import namedtuple
+from datetime import datetime
+from config.settings import CACHE_PATH, CACHE_GENERATIONS
+from utils.slots import EMPTY_SCHEDULE, as_schedule
+from utils.schedule_diff import change_kinds, diff_day, past_slots
+from utils.timeline import rebuild_timeline
 
-def load_cached_schedules():
-    """Load cached schedules from file"""
+# Version of the on-disk envelope {"format", "sha256", "data"}
+CACHE_FORMAT = 2
+
+# Key of the resident schedule store
+ScheduleKey = namedtuple('ScheduleKey', ['date', 'subqueue'])
+
+# Resident schedule store: ScheduleKey -> DaySchedule (on disk as [guaranteed, possible]).
+# Loaded once at startup and replaced as a whole on every update,
+# so readers do plain dict lookups without locks or file I/O.
+_schedule_store = {}
+# date_key -> GPV image URL (persisted under the "global_img" key)
+_image_store = {}
+_store_loaded = False
+# False while the store isn't backed by a valid cache file or fresh site data:
+# the next site update then becomes the baseline silently instead of looking like "everything changed"
+_store_trusted = False
+
+def _encode_schedules(cached_schedules):
+    """
+    Compact canonical JSON of the nested cache; the checksum is taken over exactly this text.
+    DaySchedule values are tuples, so they are written as [guaranteed, possible] lists.
+    """
+    return json.dumps(cached_schedules, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+def _generation_path(n):
+    """Path of the n-th generation of the cache file (0 = current)"""
+    return CACHE_PATH if n == 0 else f"{CACHE_PATH}.{n}"
+
+def _read_cache_file(path):
+    """Read and verify one cache file; None if it is missing or damaged"""
+    if not os.path.exists(path):
+        return None
     try:
-        if os.path.exists(CACHE_PATH):
-            with open(CACHE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        logging.error(f"Error loading cached schedules: {e}")
-        return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Cache file {path} is unreadable: {e}")
+        return None
+    if not isinstance(content, dict):
+        logging.error(f"Cache file {path} has unexpected content")
+        return None
+    if content.get('format') != CACHE_FORMAT:
+        # Plain nested dict written before checksums were introduced
+        return content
+    data = content.get('data')
+    if not isinstance(data, dict) or hashlib.sha256(_encode_schedules(data).encode('utf-8')).hexdigest() != content.get('sha256'):
+        logging.error(f"Cache file {path} failed integrity check")
+        return None
+    return data
+
+def load_cached_schedules():
+    """
+    Load cached schedules from file, falling back to older generations if it is damaged.
+    Returns None if there is no valid copy at all.
+    """
+    for n in range(CACHE_GENERATIONS + 1):
+        path = _generation_path(n)
+        data = _read_cache_file(path)
+        if data is not None:
+            if n:
+                logging.warning(f"Cache restored from older generation {path}")
+            return data
+    return None
 
 def save_cached_schedules(cached_schedules):
-    """Save cached schedules to file"""
+    """
+    Save cached schedules to file atomically: write temp file, fsync, rotate generations, rename.
+    A crash at any point leaves either the old or the new file (or an older generation) intact.
+    """
     try:
         # Ensure directory exists
         cache_dir = os.path.dirname(CACHE_PATH)
-        logging.info(f"Cache directory: '{cache_dir}', CACHE_PATH: '{CACHE_PATH}'")
         if cache_dir:  # Only create directory if it's not empty
             os.makedirs(cache_dir, exist_ok=True)
-        with open(CACHE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(cached_schedules, f, ensure_ascii=False, indent=2)
+
+        payload = _encode_schedules(cached_schedules)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        tmp_path = f"{CACHE_PATH}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f'{{"format":{CACHE_FORMAT},"sha256":"{digest}","data":{payload}}}')
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Keep previous versions: current -> .1 -> .2 ... (oldest dropped)
+        for n in range(CACHE_GENERATIONS, 0, -1):
+            if os.path.exists(_generation_path(n - 1)):
+                os.replace(_generation_path(n - 1), _generation_path(n))
+        os.replace(tmp_path, CACHE_PATH)
+
+        # Make the renames durable too (POSIX only)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(cache_dir or '.', os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
         logging.info(f"Successfully saved {len(cached_schedules)} cached schedules")
     except Exception as e:
         logging.error(f"Error saving cached schedules: {e}")
         import traceback
         traceback.print_exc()
 
+def _build_store(cached_schedules):
+    """Split the nested format into (schedule store, image store); legacy schedule text is parsed"""
+    store = {}
+    images = dict(cached_schedules.get("global_img", {}))
+    for date_key, schedules in cached_schedules.items():
+        if date_key == "global_img" or not isinstance(schedules, dict):
+            continue
+        for subqueue, value in schedules.items():
+            schedule = as_schedule(value)
+            if schedule:
+                store[ScheduleKey(date_key, subqueue)] = schedule
+    return store, images
+
+def _store_to_nested(store, images):
+    """Convert the resident store back to the on-disk nested format"""
+    nested = {}
+    for (date_key, subqueue), schedule in store.items():
+        nested.setdefault(date_key, {})[subqueue] = schedule
+    if images:
+        nested["global_img"] = dict(images)
+    return nested
+
+def _on_store_changed():
+    """Rebuild derived indexes and re-place alert jobs after the store was replaced"""
+    rebuild_timeline(_schedule_store)
+    from utils.alerts import schedule_alert_jobs
+    try:
+        schedule_alert_jobs()
+    except Exception as e:
+        logging.error(f"Error scheduling alert jobs: {e}")
+
+def load_schedule_store():
+    """Load the resident schedule store from disk (once, at startup)"""
+    global _schedule_store, _image_store, _store_loaded, _store_trusted
+    cached_schedules = load_cached_schedules()
+    _store_trusted = cached_schedules is not None
+    if not _store_trusted:
+        logging.warning("No valid schedule cache on disk, next site update will not notify users")
+    _schedule_store, _image_store = _build_store(cached_schedules or {})
+    _store_loaded = True
+    _on_store_changed()
+    logging.info(f"Schedule store loaded: {len(_schedule_store)} schedules")
+
+def _ensure_store_loaded():
+    if not _store_loaded:
+        load_schedule_store()
+
+def replace_schedule_store(cached_schedules, persist=True):
+    """Swap in a new store built from nested {date: {subqueue: DaySchedule}, "global_img": {...}} data"""
+    global _schedule_store, _image_store, _store_loaded, _store_trusted
+    _schedule_store, _image_store = _build_store(cached_schedules)
+    _store_loaded = True
+    _store_trusted = True
+    _on_store_changed()
+    if persist:
+        save_cached_schedules(_store_to_nested(_schedule_store, _image_store))
+
 def get_schedule_for_date(date_key, subqueue):
-    """Get schedule for specific date and subqueue from cache"""
-    cached = load_cached_schedules()
-    date_data = cached.get(date_key, {})
-    return date_data.get(subqueue, "")
+    """Get DaySchedule for specific date and subqueue from the resident store (empty if unknown)"""
+    _ensure_store_loaded()
+    return _schedule_store.get(ScheduleKey(date_key, subqueue), EMPTY_SCHEDULE)
 
-def update_cached_schedule(date_key, subqueue, schedule_text, schedule_type="full"):
-    """
-    Update cached schedule
-    schedule_type: "full" - complete schedule, "changes" - only changes
-    """
-    cached = load_cached_schedules()
-
-    if date_key not in cached:
-        cached[date_key] = {}
-
-    if schedule_type == "full":
-        # Complete schedule update
-        cached[date_key][subqueue] = schedule_text
-    elif schedule_type == "changes":
-        # Supplement existing schedule with changes
-        existing = cached[date_key].get(subqueue, "")
-        if existing and schedule_text:
-            # Merge logic (simplified for now)
-            cached[date_key][subqueue] = existing + "; " + schedule_text
-        else:
-            cached[date_key][subqueue] = schedule_text
-
-    save_cached_schedules(cached)
+def get_date_schedules(date_key):
+    """
+    {subqueue: DaySchedule} of a date from the resident store.
+    None if the date is unknown or the store isn't trusted yet, i.e. there is nothing to compare with.
+    """
+    _ensure_store_loaded()
+    if not _store_trusted:
+        return None
+    schedules = {key.subqueue: schedule for key, schedule in _schedule_store.items() if key.date == date_key}
+    if not schedules and date_key not in _image_store:
+        return None
+    return schedules
+
+def get_image_url(date_key):
+    """Get GPV image URL for date from the resident store"""
+    _ensure_store_loaded()
+    return _image_store.get(date_key)
+
+def update_cached_schedule(date_key, subqueue, schedule):
+    """Replace cached DaySchedule of one date and subqueue"""
+    global _schedule_store
+    _ensure_store_loaded()
+    # Copy-on-write so concurrent readers always see a complete store
+    store = dict(_schedule_store)
+    store[ScheduleKey(date_key, subqueue)] = schedule
+
+    _schedule_store = store
+    _on_store_changed()
+    save_cached_schedules(_store_to_nested(_schedule_store, _image_store))
     logging.info(f"Updated cached schedule for {date_key}, {subqueue}")
 
 async def initialize_cache():
     """Initialize cache with data from site on bot startup"""
     try:
         logging.info("Initializing cache with site data...")
-        from utils.monitoring import parse_hoe_smart
-        from utils.helpers import normalize_schedule_text
+        from utils.snapshot import refresh_snapshot
+
+        # Load what we had on disk so lookups work even if the site is down
+        load_schedule_store()
 
-        # Parse site data
-        all_data = await parse_hoe_smart()
+        # Parse site data (fills the shared snapshot)
+        all_data = await refresh_snapshot()
         if not all_data:
             logging.warning("No data received from site during cache initialization")
             return
@@ -78,20 +223,25 @@ async def initialize_cache():
 
         # Fill cache with all available schedules
         cached_schedules = {}
+        global_images = {}
         for date_key, data in all_data.items():
+            if data.get('img_url'):
+                global_images[date_key] = data['img_url']
             if 'schedules' in data and data['schedules']:
                 cached_schedules[date_key] = {}
-                for subqueue, schedule_text in data['schedules'].items():
-                    normalized_text = normalize_schedule_text(schedule_text)
-                    if normalized_text:  # Only save non-empty schedules
-                        cached_schedules[date_key][subqueue] = normalized_text
+                for subqueue, schedule in data['schedules'].items():
+                    if schedule:  # Only save non-empty schedules
+                        cached_schedules[date_key][subqueue] = schedule
             else:
                 logging.info(f"No schedules found for date {date_key}")
 
         logging.info(f"Prepared cache with {len(cached_schedules)} dates and {sum(len(schedules) for schedules in cached_schedules.values())} schedules")
 
-        # Save to cache file
-        save_cached_schedules(cached_schedules)
+        # Swap in the fresh store; only touch the file if something differs from disk
+        if global_images:
+            cached_schedules["global_img"] = global_images
+        persist = cached_schedules != _store_to_nested(_schedule_store, _image_store)
+        replace_schedule_store(cached_schedules, persist=persist)
         logging.info(f"Cache initialized successfully")
 
         # Generate clocks for all subqueues
@@ -104,25 +254,33 @@ async def initialize_cache():
         traceback.print_exc()
 
 async def check_and_update_cache():
-    """Check for updates on site and update cache/clocks only if changed"""
+    """
+    Check for updates on site and update cache/clocks only if changed.
+    Returns (updated, changes) with changes = {date: {subqueue: change kinds}};
+    schedules that changed only in already passed slots update the cache but are not in changes.
+    """
     try:
         logging.info("Checking for schedule updates...")
-        from utils.monitoring import parse_hoe_smart
-        from utils.helpers import normalize_schedule_text
+        from utils.snapshot import refresh_snapshot
 
-        # 1. Отримуємо свіжі дані
-        all_data = await parse_hoe_smart()
+        # 1. Отримуємо свіжі дані (оновлює спільний знімок)
+        all_data = await refresh_snapshot()
+        if all_data is None:
+            logging.info("Site content not modified, skipping parse and diff")
+            return False, {}
         if not all_data:
             logging.warning("No data received from site during update check")
             return False, {}
 
-        # 2. Завантажуємо поточний кеш
-        current_cache = load_cached_schedules()
+        # 2. Поточний кеш - резидентне сховище (без читання файлу)
+        _ensure_store_loaded()
 
         has_changes = False
         new_cache = {}
         global_images = {}
-        changes = {}  # Тут ми збираємо: дата -> список змінених черг
+        changes = {}  # Тут ми збираємо: дата -> {підчерга: види змін}
+        current_cache = _store_to_nested(_schedule_store, {})
+        now = datetime.now()
 
         # 3. Аналізуємо дані
         for date_key, data in all_data.items():
@@ -133,20 +291,29 @@ async def check_and_update_cache():
             if 'schedules' in data and data['schedules']:
                 new_cache[date_key] = {}
                 
-                for subqueue, schedule_text in data['schedules'].items():
-                    normalized_text = normalize_schedule_text(schedule_text)
-                    if normalized_text:
-                        new_cache[date_key][subqueue] = normalized_text
+                for subqueue, schedule in data['schedules'].items():
+                    if schedule:
+                        new_cache[date_key][subqueue] = schedule
+
+                # Порівнюємо з тим, що було в кеші, по слотах
+                day_changes = diff_day(current_cache.get(date_key, {}), new_cache[date_key], past_slots(date_key, now))
+                for subqueue, change in day_changes.items():
+                    has_changes = True
+                    if not change:
+                        # Минулі години вже нікого не цікавлять
+                        logging.info(f"Schedule for {subqueue} on {date_key} changed only in the past, not notifying")
+                        continue
+                    kinds = change_kinds(change)
+                    changes.setdefault(date_key, {})[subqueue] = kinds
+                    logging.info(f"Schedule changed for {subqueue} on {date_key}: {', '.join(kinds)}")
 
-                        # Порівнюємо з тим, що було в кеші
-                        current_schedule = current_cache.get(date_key, {}).get(subqueue, "")
-                        
-                        if normalized_text != current_schedule:
-                            has_changes = True
-                            if date_key not in changes:
-                                changes[date_key] = []
-                            changes[date_key].append(subqueue)
-                            logging.info(f"Schedule changed for {subqueue} on {date_key}")
+        if not _store_trusted:
+            # Nothing reliable to compare with (cache file lost or damaged): take site data as the baseline
+            logging.warning("Schedule cache was not restored, saving site data without notifications")
+            new_cache["global_img"] = global_images
+            replace_schedule_store(new_cache)
+            await generate_all_clocks_for_cache(new_cache)
+            return False, {}
 
         if not has_changes:
             logging.info("No schedule changes detected")
@@ -154,7 +321,7 @@ async def check_and_update_cache():
 
         # 4. Зберігаємо оновлення
         new_cache["global_img"] = global_images  # Спрощений ключ для картинок
-        save_cached_schedules(new_cache)
+        replace_schedule_store(new_cache)
 
         # 5. Генеруємо годинники
         await generate_all_clocks_for_cache(new_cache)
@@ -170,48 +337,48 @@ async def check_and_update_cache():
 
 
 async def generate_all_clocks_for_cache(cached_schedules):
-    """Generate clock images for all cached schedules"""
+    """
+    Generate clock schedule layers for all cached schedules.
+    Layers whose (date, subqueue, schedule hash) already exist are skipped;
+    the time hand is composited when a clock is sent, so nothing here depends on the hour.
+    """
     try:
-        from ocr.parser import generate_clock_image
+        import asyncio
+        from ocr.parser import generate_clock_image, cleanup_old_clocks, get_clock_layer_path
+        from utils.cpu_pool import run_cpu
+
+        cleanup_old_clocks()
 
-        total_clocks = 0
+        async def render(date_key, subqueue, schedule):
+            try:
+                # Generate clock image in the CPU pool
+                await run_cpu(generate_clock_image, subqueue, schedule, date_key.replace('.', '_'))
+                logging.debug(f"Generated clock for {subqueue} on {date_key}")
+                return True
+            except Exception as e:
+                logging.error(f"Error generating clock for {subqueue} on {date_key}: {e}")
+                return False
+
+        jobs = []
         for date_key, schedules in cached_schedules.items():
-            for subqueue, schedule_text in schedules.items():
-                try:
-                    # Generate clock image
-                    clock_file = generate_clock_image(subqueue, schedule_text, date_key.replace('.', '_'))
-                    total_clocks += 1
-                    logging.debug(f"Generated clock for {subqueue} on {date_key}")
-                except Exception as e:
-                    logging.error(f"Error generating clock for {subqueue} on {date_key}: {e}")
+            if date_key == "global_img":
+                continue
+            for subqueue, schedule in schedules.items():
+                if os.path.exists(get_clock_layer_path(subqueue, schedule, date_key.replace('.', '_'))):
+                    continue
+                jobs.append(render(date_key, subqueue, schedule))
+
+        # The pool bounds how many actually run at once
+        results = await asyncio.gather(*jobs)
+        total_clocks = sum(results)
 
-        logging.info(f"Generated {total_clocks} clock images")
+        logging.info(f"Generated {total_clocks} clock layers")
 
     except Exception as e:
         logging.error(f"Error generating clocks: {e}")
         import traceback
         traceback.print_exc()
 
-async def update_clock_time_hands():
-    """Update time hands on all existing clock images (hourly job)"""
-    try:
-        logging.info("Updating time hands on clock images...")
-        
-        # Load current cache to get all schedules
-        cached_schedules = load_cached_schedules()
-        if not cached_schedules:
-            logging.warning("No cached schedules found for clock update")
-            return
-
-        # Regenerate all clocks with updated time hands
-        await generate_all_clocks_for_cache(cached_schedules)
-        logging.info("Time hands updated on all clock images")
-
-    except Exception as e:
-        logging.error(f"Error updating clock time hands: {e}")
-        import traceback
-        traceback.print_exc()
-
-
 def get_cache_data():
-    return load_cached_schedules()
+    _ensure_store_loaded()
+    return _store_to_nested(_schedule_store, _image_store)
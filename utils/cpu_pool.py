@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import CPU_POOL_WORKERS, CPU_POOL_MAX_PENDING, CPU_TASK_TIMEOUT
+
+# Process pool for CPU-bound stages (OCR, clock rendering), so the event loop only awaits results
+_executor = None
+# Limits tasks handed to the pool; callers wait here instead of piling up in the pool queue
+_slots = None
+# task name -> counters, see _record()
+_metrics = {}
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: workers must not inherit the event loop, sockets or threads of the bot process
+        _executor = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        logging.info(f"CPU pool started with {CPU_POOL_WORKERS} workers")
+    return _executor
+
+def _get_slots():
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(CPU_POOL_MAX_PENDING)
+    return _slots
+
+def _record(name, outcome, wait_time, run_time):
+    m = _metrics.setdefault(name, {
+        'calls': 0, 'failures': 0, 'timeouts': 0,
+        'total_wait': 0.0, 'total_time': 0.0, 'max_time': 0.0,
+    })
+    m['calls'] += 1
+    if outcome == 'failure':
+        m['failures'] += 1
+    elif outcome == 'timeout':
+        m['timeouts'] += 1
+    m['total_wait'] += wait_time
+    m['total_time'] += run_time
+    m['max_time'] = max(m['max_time'], run_time)
+
+async def run_cpu(func, *args, timeout=None):
+    """
+    Run CPU-bound func(*args) in the process pool and await its result.
+    func and args must be picklable (top-level functions, plain data).
+    Raises asyncio.TimeoutError after timeout seconds (CPU_TASK_TIMEOUT by default).
+    """
+    global _executor
+    name = func.__name__
+    slots = _get_slots()
+    queued_at = time.monotonic()
+    await slots.acquire()
+    started_at = time.monotonic()
+
+    try:
+        future = asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    except Exception:
+        slots.release()
+        raise
+    # A timed out task keeps its worker busy, so keep the slot until it really finishes
+    future.add_done_callback(lambda _: slots.release())
+
+    outcome = 'ok'
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout or CPU_TASK_TIMEOUT)
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+        logging.error(f"CPU task {name} timed out")
+        raise
+    except BrokenProcessPool:
+        outcome = 'failure'
+        logging.error(f"CPU pool broken while running {name}, it will be recreated")
+        _executor = None
+        raise
+    except Exception:
+        outcome = 'failure'
+        raise
+    finally:
+        _record(name, outcome, started_at - queued_at, time.monotonic() - started_at)
+
+def get_cpu_metrics():
+    """Per-task metrics: calls, failures, timeouts, total/max run time and total queue wait (seconds)"""
+    return {name: dict(m) for name, m in _metrics.items()}
+
+def shutdown_cpu_pool():
+    """Stop worker processes (on bot shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
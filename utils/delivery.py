@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import logging
+import time
+from aiogram.exceptions import (TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest,
+                                TelegramNetworkError, TelegramServerError)
+from config.settings import DELIVERY_RATE, DELIVERY_WORKERS, DELIVERY_CHAT_INTERVAL, DELIVERY_MAX_RETRIES
+
+class _TokenBucket:
+    """Global send rate limit; pause() stops everyone after Telegram's flood control answer"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+# Priority lanes, lower goes first
+PRIORITY_ALERT = 0  # imminent outage/restore alerts
+PRIORITY_SCHEDULE = 1  # new/changed schedule notices
+PRIORITY_BROADCAST = 2  # admin broadcasts
+LANE_NAMES = {PRIORITY_ALERT: 'alert', PRIORITY_SCHEDULE: 'schedule', PRIORITY_BROADCAST: 'broadcast'}
+
+# Pending sends: (priority, seq, {'chat_id', 'send', 'future', 'attempts', 'priority', 'seq', 'deadline', 'queued_at'})
+_queue = None
+# FIFO order inside a lane
+_seq = itertools.count()
+_workers = []
+_bucket = None
+# chat_id -> monotonic time when the next message to this chat may go out
+_chat_ready_at = {}
+# Chats that blocked the bot, loaded from the database on start
+_blocked = set()
+_metrics = {'sent': 0, 'failed': 0, 'retried': 0, 'rate_limited': 0, 'blocked': 0, 'skipped': 0}
+# lane name -> sent, expired and queue-to-delivery latency (seconds)
+_lane_metrics = {name: {'sent': 0, 'expired': 0, 'total_latency': 0.0, 'max_latency': 0.0}
+                 for name in LANE_NAMES.values()}
+
+async def _ensure_started():
+    global _queue, _bucket
+    if _queue is not None:
+        return
+    # Set before awaiting, so concurrent callers don't start a second set of workers
+    _queue = asyncio.PriorityQueue()
+    _bucket = _TokenBucket(DELIVERY_RATE)
+    for _ in range(DELIVERY_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+    try:
+        from database.connection import run_read
+        from database.users import get_blocked_user_ids
+        _blocked.update(await run_read(get_blocked_user_ids))
+    except Exception as e:
+        logging.error(f"Error loading blocked users: {e}")
+    logging.info(f"Delivery engine started: {DELIVERY_WORKERS} workers, {DELIVERY_RATE} msg/s, {len(_blocked)} blocked chats")
+
+def _put(job):
+    # Requeued jobs keep their place in the lane
+    _queue.put_nowait((job['priority'], job['seq'], job))
+
+def _requeue(job, delay):
+    if delay > 0:
+        asyncio.get_running_loop().call_later(delay, _put, job)
+    else:
+        _put(job)
+
+def _finish(job, delivered):
+    if not job['future'].done():
+        job['future'].set_result(delivered)
+
+async def _mark_blocked(chat_id, reason):
+    _blocked.add(chat_id)
+    _metrics['blocked'] += 1
+    logging.info(f"Chat {chat_id} is unreachable, excluded from delivery: {reason}")
+    try:
+        from database.connection import run_write
+        from database.users import mark_user_blocked
+        await run_write(mark_user_blocked, chat_id, reason)
+    except Exception as e:
+        logging.error(f"Error saving blocked chat {chat_id}: {e}")
+
+async def _send(job):
+    chat_id = job['chat_id']
+    lane = _lane_metrics[LANE_NAMES[job['priority']]]
+    if chat_id in _blocked:
+        _metrics['skipped'] += 1
+        _finish(job, False)
+        return
+    if job['deadline'] is not None and time.time() > job['deadline']:
+        # Too late to be useful (the event has already happened)
+        lane['expired'] += 1
+        _finish(job, False)
+        return
+
+    # Per-chat pacing: don't hold a worker, come back when the chat is ready
+    now = time.monotonic()
+    ready_at = _chat_ready_at.get(chat_id, 0.0)
+    if ready_at > now:
+        _requeue(job, ready_at - now)
+        return
+    # Reserve the chat before waiting for a token, other workers may pick the same chat meanwhile
+    _chat_ready_at[chat_id] = now + DELIVERY_CHAT_INTERVAL
+
+    await _bucket.acquire()
+    _chat_ready_at[chat_id] = time.monotonic() + DELIVERY_CHAT_INTERVAL
+    try:
+        await job['send']()
+        _metrics['sent'] += 1
+        latency = time.monotonic() - job['queued_at']
+        lane['sent'] += 1
+        lane['total_latency'] += latency
+        lane['max_latency'] = max(lane['max_latency'], latency)
+        _finish(job, True)
+    except TelegramRetryAfter as e:
+        # Flood control applies to the whole bot, so everyone waits
+        _metrics['rate_limited'] += 1
+        logging.warning(f"Flood control, pausing delivery for {e.retry_after}s")
+        _bucket.pause(e.retry_after)
+        _requeue(job, e.retry_after)
+    except TelegramForbiddenError as e:
+        await _mark_blocked(chat_id, e.message)
+        _finish(job, False)
+    except TelegramBadRequest as e:
+        if 'chat not found' in str(e).lower():
+            await _mark_blocked(chat_id, e.message)
+        else:
+            logging.error(f"Failed to deliver to {chat_id}: {e}")
+            _metrics['failed'] += 1
+        _finish(job, False)
+    except (TelegramNetworkError, TelegramServerError) as e:
+        job['attempts'] += 1
+        if job['attempts'] <= DELIVERY_MAX_RETRIES:
+            _metrics['retried'] += 1
+            _requeue(job, 2 ** job['attempts'])
+        else:
+            logging.error(f"Failed to deliver to {chat_id} after {job['attempts']} attempts: {e}")
+            _metrics['failed'] += 1
+            _finish(job, False)
+
+async def _worker():
+    while True:
+        _, _, job = await _queue.get()
+        try:
+            await _send(job)
+        except asyncio.CancelledError:
+            _finish(job, False)
+            raise
+        except Exception as e:
+            logging.error(f"Failed to deliver to {job['chat_id']}: {e}")
+            _metrics['failed'] += 1
+            _finish(job, False)
+        finally:
+            _queue.task_done()
+        if len(_chat_ready_at) > 10000:
+            now = time.monotonic()
+            for chat_id in [c for c, t in _chat_ready_at.items() if t <= now]:
+                del _chat_ready_at[chat_id]
+
+async def deliver(chat_id, send, priority=PRIORITY_SCHEDULE, deadline=None):
+    """
+    Queue send (async callable without arguments, e.g. functools.partial(bot.send_message, ...))
+    for chat_id and wait until it is delivered. Returns True if delivered, False otherwise.
+    Respects the global rate limit, per-chat pacing and Telegram's RetryAfter.
+    priority: PRIORITY_ALERT / PRIORITY_SCHEDULE / PRIORITY_BROADCAST, higher lanes go first.
+    deadline: datetime after which the message is dropped instead of sent late.
+    """
+    await _ensure_started()
+    if chat_id in _blocked:
+        _metrics['skipped'] += 1
+        return False
+    future = asyncio.get_running_loop().create_future()
+    _put({'chat_id': chat_id, 'send': send, 'future': future, 'attempts': 0,
+          'priority': priority, 'seq': next(_seq), 'queued_at': time.monotonic(),
+          'deadline': deadline.timestamp() if deadline is not None else None})
+    return await future
+
+async def unblock_chat(chat_id):
+    """Allow delivery to chat again (user started the bot after blocking it)"""
+    # _blocked is loaded only when the engine starts, so the database row is cleared regardless
+    _blocked.discard(chat_id)
+    from database.connection import run_write
+    from database.users import unmark_user_blocked
+    await run_write(unmark_user_blocked, chat_id)
+
+def get_delivery_metrics():
+    """
+    Counters: sent, failed, retried, rate_limited, blocked, skipped; current queue size;
+    'lanes': per-lane sent, expired, total/max latency (seconds)
+    """
+    metrics = dict(_metrics)
+    metrics['queued'] = _queue.qsize() if _queue is not None else 0
+    metrics['lanes'] = {name: dict(m) for name, m in _lane_metrics.items()}
+    return metrics
+
+async def stop_delivery():
+    """Stop workers (on bot shutdown); waiting senders get False"""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _queue is not None:
+        while not _queue.empty():
+            _finish(_queue.get_nowait()[2], False)
+    _queue = None
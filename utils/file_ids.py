@@ -0,0 +1,119 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+from collections import OrderedDict
+from aiogram.exceptions import TelegramBadRequest
+from config.settings import FILE_ID_CACHE_PATH, FILE_ID_CACHE_SIZE
+
+# content key -> Telegram file_id of a photo the bot already uploaded, least recently used first
+_file_ids = None
+# content key -> lock, so concurrent first sends of the same picture upload it only once
+_upload_locks = {}
+
+def _load_file_ids():
+    """Load known file_ids from file (once per process)"""
+    global _file_ids
+    if _file_ids is None:
+        _file_ids = OrderedDict()
+        try:
+            if os.path.exists(FILE_ID_CACHE_PATH):
+                with open(FILE_ID_CACHE_PATH, 'r', encoding='utf-8') as f:
+                    for key, file_id in json.load(f):
+                        _file_ids[key] = file_id
+        except Exception as e:
+            logging.error(f"Error loading file_id cache: {e}")
+            _file_ids = OrderedDict()
+    return _file_ids
+
+def _save_file_ids():
+    """Save known file_ids to file"""
+    try:
+        cache_dir = os.path.dirname(FILE_ID_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(FILE_ID_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(list(_file_ids.items()), f)
+    except Exception as e:
+        logging.error(f"Error saving file_id cache: {e}")
+
+def get_file_id(key):
+    """Get file_id for content key, or None"""
+    file_ids = _load_file_ids()
+    file_id = file_ids.get(key)
+    if file_id is not None:
+        file_ids.move_to_end(key)
+    return file_id
+
+def remember_file_id(key, file_id):
+    """Store file_id for content key, evicting the least recently used over the limit"""
+    file_ids = _load_file_ids()
+    if file_ids.get(key) == file_id:
+        return
+    file_ids[key] = file_id
+    file_ids.move_to_end(key)
+    while len(file_ids) > FILE_ID_CACHE_SIZE:
+        file_ids.popitem(last=False)
+    _save_file_ids()
+
+def forget_file_id(key):
+    """Drop file_id that Telegram no longer accepts"""
+    file_ids = _load_file_ids()
+    if file_ids.pop(key, None) is not None:
+        _save_file_ids()
+
+def clock_file_key(schedule, hour):
+    """Content key of a clock: schedule layer hash + hand hour"""
+    from ocr.parser import get_schedule_hash
+    return f"clock:{get_schedule_hash(schedule)}:{hour}"
+
+def image_file_key(img_url):
+    """Content key of a site image: URL + content hash (or ETag); None if the content is unknown"""
+    from utils.http_fetch import get_validators
+    validators = get_validators(img_url)
+    digest = validators.get('sha256') or validators.get('etag')
+    return f"img:{img_url}:{digest}" if digest else None
+
+async def send_cached_photo(chat_id, key, make_photo, **kwargs):
+    """
+    Send a photo, reusing the Telegram file_id if the same content was uploaded before.
+    make_photo: callable (sync or async) returning the InputFile/URL for the first upload.
+    key may be None to skip caching. Returns the sent Message.
+    """
+    from core.globals import bot
+
+    if key is None:
+        photo = make_photo()
+        if inspect.isawaitable(photo):
+            photo = await photo
+        return await bot.send_photo(chat_id, photo=photo, **kwargs)
+
+    file_id = get_file_id(key)
+    if file_id is None:
+        lock = _upload_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Someone may have uploaded it while we were waiting
+            file_id = get_file_id(key)
+            if file_id is None:
+                try:
+                    photo = make_photo()
+                    if inspect.isawaitable(photo):
+                        photo = await photo
+                    message = await bot.send_photo(chat_id, photo=photo, **kwargs)
+                    if message.photo:
+                        remember_file_id(key, message.photo[-1].file_id)
+                    return message
+                finally:
+                    # Also on failure (e.g. the first recipient blocked the bot), so locks don't pile up
+                    _upload_locks.pop(key, None)
+
+    try:
+        return await bot.send_photo(chat_id, photo=file_id, **kwargs)
+    except TelegramBadRequest as e:
+        if 'file' not in str(e).lower():
+            raise
+        # file_id expired or invalid - upload the content again
+        logging.warning(f"Cached file_id for {key} rejected: {e}")
+        forget_file_id(key)
+        return await send_cached_photo(chat_id, key, make_photo, **kwargs)
@@ -0,0 +1,77 @@
+import codecs
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+# What the bot needs from the HOE page
+GpvPage = namedtuple('GpvPage', ['images', 'subqueue_lines'])  # [(alt, src), ...], {subqueue: text}
+
+GPV_ALT_RE = re.compile(r'ГПВ')
+SUBQUEUE_RE = re.compile(r"підчерга (\d\.\d) [–-] (.*?)(?:;|\n|$)")
+
+# Tags whose text is never shown on the page
+_SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+# Tags after which the page has no schedule content (site footer)
+_STOP_TAGS = {'footer'}
+# Bytes fed to the parser at once; parsing stops between chunks
+CHUNK_SIZE = 16 * 1024
+
+class _StopParsing(Exception):
+    pass
+
+class _GpvExtractor(HTMLParser):
+    """Event-based extractor of GPV image tags and page text, no document tree is built"""
+
+    def __init__(self, collect_text):
+        super().__init__(convert_charrefs=True)
+        self.images = []
+        self.collect_text = collect_text
+        self.text = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'img':
+            attrs = dict(attrs)
+            alt = attrs.get('alt') or ''
+            if GPV_ALT_RE.search(alt) and attrs.get('src'):
+                self.images.append((alt, attrs['src']))
+        elif tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag in _STOP_TAGS and self.images:
+            # Everything we need is above the footer
+            raise _StopParsing
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'img':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.collect_text and not self._skip_depth:
+            self.text.append(data)
+
+def extract_gpv_page(html, collect_text=False):
+    """
+    Stream the page through an event-based parser and pull out only GPV images
+    (and, with collect_text=True, the "підчерга X.Y – ..." lines).
+    Parsing stops at the footer once images were found. html may be str or bytes (UTF-8).
+    """
+    parser = _GpvExtractor(collect_text)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace') if isinstance(html, bytes) else None
+    try:
+        for start in range(0, len(html), CHUNK_SIZE):
+            chunk = html[start:start + CHUNK_SIZE]
+            parser.feed(decoder.decode(chunk) if decoder else chunk)
+        if decoder:
+            parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+    except _StopParsing:
+        pass
+
+    subqueue_lines = {}
+    if collect_text:
+        subqueue_lines = {m[0]: m[1].strip() for m in SUBQUEUE_RE.findall("".join(parser.text))}
+    return GpvPage(parser.images, subqueue_lines)
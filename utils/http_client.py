@@ -0,0 +1,31 @@
+import logging
+import aiohttp
+from config.settings import HTTP_POOL_SIZE, HTTP_POOL_PER_HOST, HTTP_DNS_TTL, HTTP_KEEPALIVE, HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT
+
+# One long-lived session for all outgoing HTTP (site page, GPV images):
+# keeps TLS connections alive between polls and caches DNS lookups
+_session = None
+
+def get_session():
+    """Shared pooled aiohttp session, created on first use inside the running event loop"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        logging.info("HTTP client session opened")
+    return _session
+
+async def close_http_client():
+    """Close the shared session (on bot shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+import os
+from config.settings import HTTP_CACHE_PATH
+
+# url -> {'etag': ..., 'last_modified': ..., 'sha256': ...}
+_validators = None
+
+def _load_validators():
+    """Load stored HTTP validators from file (once per process)"""
+    global _validators
+    if _validators is None:
+        try:
+            if os.path.exists(HTTP_CACHE_PATH):
+                with open(HTTP_CACHE_PATH, 'r', encoding='utf-8') as f:
+                    _validators = json.load(f)
+            else:
+                _validators = {}
+        except Exception as e:
+            logging.error(f"Error loading HTTP validators: {e}")
+            _validators = {}
+    return _validators
+
+def _save_validators():
+    """Save HTTP validators to file"""
+    try:
+        cache_dir = os.path.dirname(HTTP_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(HTTP_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(_validators, f, ensure_ascii=False)
+    except Exception as e:
+        logging.error(f"Error saving HTTP validators: {e}")
+
+def get_validators(url):
+    """Get stored validators for url ({} if never fetched)"""
+    return _load_validators().get(url, {})
+
+def remember_validators(url, validators):
+    """
+    Store validators for url.
+    Call only after the content has been fully processed, so a failed parse
+    is retried on the next poll instead of being skipped as "not modified".
+    """
+    stored = _load_validators()
+    if stored.get(url) != validators:
+        stored[url] = validators
+        _save_validators()
+
+async def fetch_conditional(session, url, conditional=True):
+    """
+    GET url with If-None-Match / If-Modified-Since taken from the stored validators.
+    Returns (body, changed, validators):
+    - body is None when the server answered 304
+    - changed is False on 304 or when the body hash matches the stored one
+    With conditional=False the request is unconditional and changed is always True.
+    """
+    previous = get_validators(url) if conditional else {}
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            logging.debug(f"Not modified (304): {url}")
+            return None, False, previous
+        response.raise_for_status()
+        body = await response.read()
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': hashlib.sha256(body).hexdigest(),
+        }
+        changed = validators['sha256'] != previous.get('sha256')
+        if not changed:
+            logging.debug(f"Content hash unchanged: {url}")
+        return body, changed, validators
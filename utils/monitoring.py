@@ -1,200 +1,162 @@
 import asyncio
-import aiohttp
 import logging
 import re
 from datetime import datetime
-from bs4 import BeautifulSoup
-from config.settings import URL_PAGE
-
-from utils.notifications import send_schedule_notifications
+from config.settings import URL_PAGE, IMAGE_FETCH_CONCURRENCY
+from utils.http_client import get_session
+from utils.html_extract import extract_gpv_page
+
+from utils.notifications import send_schedule_notifications
+
+# Running notification fan-out; the next one waits for it, so notifications keep their order
+_fanout_task = None
 
 
-async def send_upcoming_events_notifications():
-    """Надсилає сповіщення про зміну статусів, групуючи адреси користувача"""
-    logging.info("Starting send_upcoming_events_notifications check")
-    try:
-        from database.notifications import get_user_notification_settings
-        from database.addresses import get_all_user_addresses
-        from database.connection import get_db_connection
-        from core.globals import bot
-        from utils.cache import get_schedule_for_date
-        from utils.helpers import parse_schedule_to_intervals
-        from datetime import datetime, timedelta
-
-        now = datetime.now()
-        # Перевіряємо вікно навколо 30-хвилинної позначки
-        check_times = [now + timedelta(minutes=m) for m in [25, 30, 35]]
-
-        today_str = now.strftime("%d.%m.%Y")
-        tomorrow_str = (now + timedelta(days=1)).strftime("%d.%m.%Y")
-
-        # 1. Збираємо всіх активних користувачів
-        subqueue_users = {} 
-        user_general_settings = {} 
-        
-        all_addresses = get_all_user_addresses()
-        for uid, addr_name, subq in all_addresses:
-            if uid not in user_general_settings:
-                user_general_settings[uid] = get_user_notification_settings(uid)
-            
-            if user_general_settings[uid].get('notifications_enabled'):
-                addr_settings = get_user_notification_settings(uid, addr_name)
-                if addr_settings.get('notifications_enabled'):
-                    if subq not in subqueue_users:
-                        subqueue_users[subq] = []
-                    subqueue_users[subq].append((uid, addr_name))
-
-        # 2. Визначаємо події для кожної підчерги
-        # (uid, status_future, time) -> set of address_names
-        pending_alerts = {}
-
-        for sub_q, users in subqueue_users.items():
-            if not users: continue
-
-            intervals_today = parse_schedule_to_intervals(get_schedule_for_date(today_str, sub_q))
-            intervals_tomorrow = parse_schedule_to_intervals(get_schedule_for_date(tomorrow_str, sub_q))
-
-            def get_status_at_time(check_time):
-                # Логіка визначення кольору (залишається твоя оригінальна)
-                for start_h, end_h in intervals_today['guaranteed']:
-                    s = datetime.combine(now.date(), datetime.min.time()) + timedelta(hours=start_h)
-                    e = s + timedelta(hours=(end_h - start_h if end_h > start_h else end_h - start_h + 24))
-                    if s <= check_time < e: return 'black'
-                for start_h, end_h in intervals_today['possible']:
-                    s = datetime.combine(now.date(), datetime.min.time()) + timedelta(hours=start_h)
-                    e = s + timedelta(hours=(end_h - start_h if end_h > start_h else end_h - start_h + 24))
-                    if s <= check_time < e: return 'grey'
-                return 'white'
-
-            status_now = get_status_at_time(now)
-            
-            for f_time in check_times:
-                status_future = get_status_at_time(f_time)
-                if status_future != status_now:
-                    # Знайшли перехід!
-                    event_time_str = f_time.strftime("%H:00") if f_time.minute > 45 else f_time.strftime("%H:%M")
-                    event_date_str = f_time.strftime("%Y-%m-%d")
-                    
-                    # Формуємо базовий текст
-                    msg = ""
-                    if status_now == 'white' and status_future == 'grey': msg = "⚠️ <b>МОЖЛИВЕ ВІДКЛЮЧЕННЯ</b>"
-                    elif status_now == 'white' and status_future == 'black': msg = "⚠️ <b>ВІДКЛЮЧЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
-                    elif status_now == 'black' and status_future == 'white': msg = "✅ <b>ВІДНОВЛЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
-                    elif status_now == 'grey' and status_future == 'black': msg = "⚠️ <b>ГАРАНТОВАНЕ ВІДКЛЮЧЕННЯ</b>"
-                    elif status_now != 'white' and status_future == 'white': msg = "✅ <b>ВІДНОВЛЕННЯ ЕЛЕКТРОЕНЕРГІЇ</b>"
-                    
-                    if msg:
-                        for uid, addr in users:
-                            # Ключ групування: юзер + тип події + час
-                            key = (uid, msg, event_time_str, event_date_str)
-                            if key not in pending_alerts: pending_alerts[key] = set()
-                            pending_alerts[key].add(addr)
-                    break # Для цієї черги подію знайдено
-
-        # 3. Відправка згрупованих сповіщень
-        sent_count = 0
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            for (uid, title, e_time, e_date), addrs in pending_alerts.items():
-                # Перевірка на дублікат у базі
-                cursor.execute('SELECT 1 FROM sent_alerts WHERE user_id=? AND event_time=? AND event_date=?', 
-                               (uid, e_time, e_date))
-                if cursor.fetchone(): continue
-
-                addr_str = ", ".join(addrs)
-                full_message = f"{title}\n\nОрієнтовно о {e_time}\nАдреса: <b>{addr_str}</b>"
-
-                try:
-                    await bot.send_message(uid, full_message, parse_mode="HTML")
-                    cursor.execute('INSERT INTO sent_alerts VALUES (?, ?, ?)', (uid, e_time, e_date))
-                    sent_count += 1
-                except Exception as e:
-                    logging.error(f"Failed to send to {uid}: {e}")
-                await asyncio.sleep(0.05)
-            conn.commit()
-
-        logging.info(f"Sent {sent_count} grouped notifications")
-    except Exception as e:
-        logging.error(f"Error in notifications: {e}")
-        
 async def parse_hoe_data():
     """Parse basic schedule data from HOE website"""
-    async with aiohttp.ClientSession() as session:
+    try:
+        async with get_session().get(URL_PAGE) as response:
+            html = await response.text()
+            page = extract_gpv_page(html, collect_text=True)
+            alt, src = page.images[0] if page.images else ("Графік відключень", None)
+            img_url = "https://hoe.com.ua" + src if src else None
+            return alt, page.subqueue_lines, img_url
+    except Exception as e:
+        logging.error(f"Error parsing: {e}")
+        return None, None, None
+
+async def _read_gpv_image(session, img_url, known, limit):
+    """
+    Fetch and OCR one GPV image (known: its previous result or None).
+    Returns (schedules, uncertain, parsed); parsed is False if the image could not be
+    fetched or OCR found nothing, so one bad image empties only its own date.
+    """
+    from utils.http_fetch import fetch_conditional, remember_validators
+    from ocr.parser import read_schedule_bytes
+
+    async with limit:
         try:
-            async with session.get(URL_PAGE, timeout=15) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                img_tag = soup.find('img', alt=re.compile(r'ГПВ'))
-                date_str = img_tag['alt'] if img_tag else "Графік відключень"
-                img_url = "https://hoe.com.ua" + img_tag['src'] if img_tag else None
-                page_text = soup.get_text()
-                patterns = re.findall(r"підчерга (\d\.\d) [–-] (.*?)(?:;|\n|$)", page_text)
-                schedules = {p[0]: p[1].strip() for p in patterns}
-                return date_str, schedules, img_url
+            image_data, image_changed, image_validators = await fetch_conditional(session, img_url, conditional=known is not None)
+            if known is not None and not image_changed:
+                # Same image as last time - reuse its OCR result
+                logging.info(f"GPV image {img_url} not modified, reusing previous result")
+                return known['ocr_schedules'], known['uncertain'], True
+
+            # Use OCR to parse schedule from image instead of HTML text
+            schedules, uncertain = await read_schedule_bytes(image_data)
         except Exception as e:
-            logging.error(f"Error parsing: {e}")
-            return None, None, None
-
-async def parse_hoe_smart():
-    """Smart parsing of HOE website with multiple dates support"""
+            logging.error(f"Error reading GPV image {img_url}: {e}")
+            return {}, {}, False
+        if schedules:
+            remember_validators(img_url, image_validators)
+        return schedules, uncertain, bool(schedules)
+
+async def parse_hoe_smart(previous=None):
+    """
+    Smart parsing of HOE website with multiple dates support.
+    previous: last parsed data; when given, the page and images are fetched
+    conditionally and None is returned if the page has not changed.
+    Images are fetched and parsed concurrently (IMAGE_FETCH_CONCURRENCY at once) over the shared session.
+    """
     logging.info("Parsing site...")
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(URL_PAGE, timeout=15) as response:
-                html = await response.text()
-                # Use lxml if available for better performance
-                try:
-                    soup = BeautifulSoup(html, 'lxml')
-                except:
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                # Find all GVP image containers
-                img_containers = soup.find_all('img', alt=re.compile(r'ГПВ'))
-                logging.info(f"Found {len(img_containers)} GVP images")
-                
-                data_by_date = {}
-
-                for img in img_containers:
-                    # Extract date from alt (e.g. "ГПВ-17.01.26")
-                    alt_text = img.get('alt', '')
-                    date_match = re.search(r'(\d{2}\.\d{2}\.\d{2,4})', alt_text)
-                    if not date_match: continue
-
-                    date_key = date_match.group(1)
-                    # Format date to DD.MM.YYYY if needed
-                    if len(date_key) == 8:  # DD.MM.YY
-                        date_key = date_key[:6] + '20' + date_key[6:]
-
-                    img_url = "https://hoe.com.ua" + img['src']
-
-                    # Use OCR to parse schedule from image instead of HTML text
-                    from ocr.parser import parse_schedule_image
-                    schedules = await parse_schedule_image(img_url)
-
-                    data_by_date[date_key] = {
-                        'img_url': img_url,
-                        'schedules': schedules,
-                        'text_content': f"OCR parsed from image: {len(schedules)} schedules found"
-                    }
-
-                return data_by_date
+    from utils.http_fetch import fetch_conditional, remember_validators
 
-        except Exception as e:
-            logging.error(f"Error in smart parsing: {e}")
-            return {}
+    session = get_session()
+    try:
+        html, page_changed, page_validators = await fetch_conditional(session, URL_PAGE, conditional=bool(previous))
+        if not page_changed:
+            logging.info("Site page not modified, skipping parse")
+            # ETag/Last-Modified may have moved even if the body did not
+            remember_validators(URL_PAGE, page_validators)
+            return None
+
+        # Only GPV image tags are needed, so the page is streamed instead of building a full tree
+        gpv_images = extract_gpv_page(html).images
+        logging.info(f"Found {len(gpv_images)} GVP images")
+
+        # Previously parsed results by image URL, reused when an image is unchanged
+        previous_by_url = {data['img_url']: data for data in (previous or {}).values() if data.get('img_url')}
+
+        images = {}
+        for alt_text, src in gpv_images:
+            # Extract date from alt (e.g. "ГПВ-17.01.26")
+            date_match = re.search(r'(\d{2}\.\d{2}\.\d{2,4})', alt_text)
+            if not date_match: continue
+
+            date_key = date_match.group(1)
+            # Format date to DD.MM.YYYY if needed
+            if len(date_key) == 8:  # DD.MM.YY
+                date_key = date_key[:6] + '20' + date_key[6:]
+
+            images[date_key] = "https://hoe.com.ua" + src
+
+        limit = asyncio.Semaphore(IMAGE_FETCH_CONCURRENCY)
+        # return_exceptions: a failed image must not abandon the other reads still running
+        results = await asyncio.gather(*(_read_gpv_image(session, img_url, previous_by_url.get(img_url), limit)
+                                         for img_url in images.values()), return_exceptions=True)
+
+        data_by_date = {}
+        all_images_parsed = True
+        for (date_key, img_url), result in zip(images.items(), results):
+            if isinstance(result, BaseException):
+                logging.error(f"Error reading GPV image {img_url}: {result}")
+                result = ({}, {}, False)
+            schedules, uncertain, parsed = result
+            all_images_parsed = all_images_parsed and parsed
+            # 'schedules' is filled from the raw reading by the stability filter (utils.snapshot)
+            data_by_date[date_key] = {
+                'img_url': img_url,
+                'ocr_schedules': schedules,
+                'uncertain': uncertain,
+                'schedules': schedules,
+                'text_content': f"OCR parsed from image: {len(schedules)} schedules found"
+            }
+
+        # Only mark the page as seen once every image on it was parsed,
+        # otherwise a failed OCR would be skipped as "not modified" next time
+        if all_images_parsed:
+            remember_validators(URL_PAGE, page_validators)
+
+        return data_by_date
+
+    except Exception as e:
+        logging.error(f"Error in smart parsing: {e}")
+        return {}
+
+async def _send_notifications_after(previous, changes):
+    """Send notifications for changes once the previous fan-out (if any) has finished"""
+    if previous is not None:
+        await asyncio.wait({previous})
+    try:
+        await send_schedule_notifications(changes)
+    except Exception as e:
+        logging.error(f"Error sending schedule notifications: {e}")
+
+def _start_fanout(changes):
+    """Run the notification fan-out as its own task, so monitor_job is not held by it"""
+    global _fanout_task
+    previous = _fanout_task if _fanout_task is not None and not _fanout_task.done() else None
+    _fanout_task = asyncio.create_task(_send_notifications_after(previous, changes))
 
 async def monitor_job():
-    """Monitor job for checking schedule updates"""
+    """Monitor job for checking schedule updates; places its own next run (see utils/polling.py)"""
+    from utils.polling import record_change, schedule_next_poll
+
     logging.info("Monitor job executed")
     try:
         # Check for updates and only regenerate if changed
         from utils.cache import check_and_update_cache
         updated, changes = await check_and_update_cache()
         if updated:
+            record_change()
             logging.info("Cache updated with new data, clocks regenerated")
-            # Send notifications for changes
-            await send_schedule_notifications(changes)
+            # The fan-out may outlast the fast interval; running inside this job it would make
+            # the scheduler skip (and drop) the next one-shot monitor run
+            _start_fanout(changes)
         else:
             logging.info("No changes detected, cache unchanged")
     except Exception as e:
-        logging.error(f"Error in monitor job: {e}")
\ No newline at end of file
+        logging.error(f"Error in monitor job: {e}")
+    finally:
+        # Placed only when this run is done, so the next run never overlaps it
+        schedule_next_poll()
\ No newline at end of file
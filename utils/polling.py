@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from config.settings import (POLL_HISTORY_PATH, POLL_HISTORY_DAYS, POLL_MIN_HISTORY_DAYS, POLL_HOT_WINDOWS,
+                             POLL_HOT_MIN_DAYS, POLL_AFTER_CHANGE_MINUTES,
+                             POLL_FAST_INTERVAL, POLL_NORMAL_INTERVAL, POLL_SLOW_INTERVAL)
+
+MONITOR_JOB_ID = 'monitor'
+# Changes within this many minutes of the current time of day (on any past day) count as "at this time"
+HISTORY_WINDOW_MINUTES = 60
+
+# {'started': when observation began, 'changes': [when a schedule change was detected, ...]}
+_history = None
+# Last decision of schedule_next_poll, see get_poll_policy()
+_policy = {}
+
+def _parse_windows(spec):
+    """
+    '20:00-24:00, 22:00-02:00' -> [(start_minute, end_minute), ...];
+    end <= start means the window runs past midnight
+    """
+    windows = []
+    for part in spec.split(','):
+        try:
+            start, end = part.strip().split('-')
+            (sh, sm), (eh, em) = start.split(':'), end.split(':')
+            window = (int(sh) * 60 + int(sm), int(eh) * 60 + int(em))
+            if not all(0 <= m <= 24 * 60 for m in window) or window[0] == window[1]:
+                raise ValueError
+            windows.append(window)
+        except ValueError:
+            if part.strip():
+                logging.error(f"Invalid polling window: {part!r}")
+    return windows
+
+def _in_window(minute, start, end):
+    if start < end:
+        return start <= minute < end
+    # Past midnight, e.g. 22:00-02:00
+    return minute >= start or minute < end
+
+HOT_WINDOWS = _parse_windows(POLL_HOT_WINDOWS)
+
+def _load_history():
+    """Load change history from file (once per process)"""
+    global _history
+    if _history is None:
+        try:
+            if os.path.exists(POLL_HISTORY_PATH):
+                with open(POLL_HISTORY_PATH, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+                _history = {
+                    'started': datetime.fromisoformat(raw['started']),
+                    'changes': [datetime.fromisoformat(ts) for ts in raw['changes']],
+                }
+        except Exception as e:
+            logging.error(f"Error loading polling history: {e}")
+        if _history is None:
+            _history = {'started': datetime.now(), 'changes': []}
+    return _history
+
+def _save_history():
+    """Save change history to file"""
+    try:
+        history_dir = os.path.dirname(POLL_HISTORY_PATH)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(POLL_HISTORY_PATH, 'w', encoding='utf-8') as f:
+            json.dump({
+                'started': _history['started'].isoformat(),
+                'changes': [ts.isoformat() for ts in _history['changes']],
+            }, f)
+    except Exception as e:
+        logging.error(f"Error saving polling history: {e}")
+
+def record_change(moment=None):
+    """Remember that a schedule change was detected (now by default)"""
+    history = _load_history()
+    moment = moment or datetime.now()
+    cutoff = moment - timedelta(days=POLL_HISTORY_DAYS)
+    history['changes'] = [ts for ts in history['changes'] if ts >= cutoff] + [moment]
+    _save_history()
+
+def _minute_of_day(moment):
+    return moment.hour * 60 + moment.minute
+
+def _days_with_changes_near(now, changes):
+    """Distinct past days with a change within HISTORY_WINDOW_MINUTES of now's time of day"""
+    minute = _minute_of_day(now)
+    days = set()
+    for ts in changes:
+        distance = abs(_minute_of_day(ts) - minute)
+        if min(distance, 24 * 60 - distance) <= HISTORY_WINDOW_MINUTES:
+            days.add(ts.date())
+    return len(days)
+
+def _seconds_to_next_window(now):
+    """Seconds until the nearest hot window starts (None if there are no windows)"""
+    minute = now.hour * 60 + now.minute + now.second / 60
+    waits = [((start - minute) % (24 * 60)) * 60 for start, _ in HOT_WINDOWS]
+    return min(waits) if waits else None
+
+def decide_interval(now=None):
+    """
+    Seconds until the next site poll, with the mode ('fast' / 'normal' / 'slow') and the reason:
+    fast in hot windows, right after a change and at times of day when changes keep happening;
+    slow when enough history shows that nothing changes at this time of day.
+    """
+    now = now or datetime.now()
+    history = _load_history()
+    changes = history['changes']
+
+    if changes and now - max(changes) < timedelta(minutes=POLL_AFTER_CHANGE_MINUTES):
+        return POLL_FAST_INTERVAL, 'fast', f"зміна о {max(changes):%H:%M}"
+
+    minute = _minute_of_day(now)
+    for start, end in HOT_WINDOWS:
+        if _in_window(minute, start, end):
+            return POLL_FAST_INTERVAL, 'fast', f"гаряче вікно {start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+    days = _days_with_changes_near(now, changes)
+    if days >= POLL_HOT_MIN_DAYS:
+        return POLL_FAST_INTERVAL, 'fast', f"у цей час змінювалось {days} дн."
+
+    observed_days = (now - history['started']).days
+    if days == 0 and observed_days >= POLL_MIN_HISTORY_DAYS:
+        interval = POLL_SLOW_INTERVAL
+        # Never sleep through the start of a hot window
+        to_window = _seconds_to_next_window(now)
+        if to_window is not None:
+            interval = max(POLL_FAST_INTERVAL, min(interval, to_window))
+        return interval, 'slow', f"за {min(observed_days, POLL_HISTORY_DAYS)} дн. у цей час змін не було"
+
+    return POLL_NORMAL_INTERVAL, 'normal', "звичайний режим"
+
+def schedule_next_poll():
+    """Place the next monitor_job run according to the current policy"""
+    from core.globals import scheduler
+    from utils.monitoring import monitor_job
+
+    now = datetime.now()
+    interval, mode, reason = decide_interval(now)
+    next_run = now + timedelta(seconds=interval)
+    scheduler.add_job(monitor_job, 'date', run_date=next_run, id=MONITOR_JOB_ID,
+                      replace_existing=True, misfire_grace_time=int(interval), coalesce=True)
+    _policy.update({'mode': mode, 'reason': reason, 'interval': interval, 'next_run': next_run})
+    logging.info(f"Next site check in {interval:.0f}s ({mode}: {reason})")
+
+def get_poll_policy():
+    """Current polling decision plus the inputs it is based on"""
+    history = _load_history()
+    return {
+        **_policy,
+        'hot_windows': list(HOT_WINDOWS),
+        'changes_recorded': len(history['changes']),
+        'last_change': max(history['changes']) if history['changes'] else None,
+        'observed_since': history['started'],
+    }
@@ -0,0 +1,63 @@
+from collections import namedtuple
+from utils.slots import EMPTY_SCHEDULE, FULL_DAY, SLOTS_PER_DAY, slot_of, slot_range
+from utils.timeline import parse_date_key
+
+class ScheduleChange(namedtuple('ScheduleChange', ['added', 'removed', 'to_guaranteed', 'to_possible'])):
+    """
+    Slot masks of what changed in one day schedule (past slots left out):
+    added - power on -> outage, removed - outage -> power on,
+    to_guaranteed - possible -> guaranteed, to_possible - guaranteed -> possible.
+    Falsy when nothing changed in the slots that are still ahead.
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return any(self)
+
+# Change kind -> text for notifications
+CHANGE_LABELS = {
+    'added': "додано відключення",
+    'removed': "скасовано відключення",
+    'to_guaranteed': "можливі → гарантовані",
+    'to_possible': "гарантовані → можливі",
+}
+
+def diff_schedules(old, new, past_slots=0):
+    """ScheduleChange from old to new DaySchedule, ignoring the first past_slots slots of the day"""
+    ahead = FULL_DAY & ~slot_range(0, past_slots)
+    old_off = old.guaranteed | old.possible
+    new_off = new.guaranteed | new.possible
+    return ScheduleChange(
+        new_off & ~old_off & ahead,
+        old_off & ~new_off & ahead,
+        new.guaranteed & old.possible & ahead,
+        new.possible & old.guaranteed & ahead,
+    )
+
+def change_kinds(change):
+    """Names of the non-empty parts of a ScheduleChange, e.g. ('added', 'to_possible')"""
+    return tuple(kind for kind, mask in zip(ScheduleChange._fields, change) if mask)
+
+def past_slots(date_key, now):
+    """How many slots of date_key are already over at now (the current slot is not)"""
+    day_start = parse_date_key(date_key)
+    if day_start is None or day_start.date() > now.date():
+        return 0
+    if day_start.date() < now.date():
+        return SLOTS_PER_DAY
+    return slot_of(now)
+
+def diff_day(old_schedules, new_schedules, past=0):
+    """
+    {subqueue: ScheduleChange} for every subqueue whose schedule differs
+    between two {subqueue: DaySchedule} dicts of the same date.
+    A missing subqueue means no outages, so a dropped one shows up as 'removed'.
+    A falsy ScheduleChange means the difference is in past slots only.
+    """
+    changes = {}
+    for subqueue in old_schedules.keys() | new_schedules.keys():
+        old = old_schedules.get(subqueue, EMPTY_SCHEDULE)
+        new = new_schedules.get(subqueue, EMPTY_SCHEDULE)
+        if old != new:
+            changes[subqueue] = diff_schedules(old, new, past)
+    return changes
@@ -3,10 +3,13 @@ import os
 from datetime import datetime, timedelta
 from aiogram import types
 from core.globals import bot
-from utils.monitoring import parse_hoe_smart
+from utils.snapshot import get_date_data
 from utils.cache import get_schedule_for_date, update_cached_schedule
-from utils.helpers import check_light_status, format_all_periods, normalize_schedule_text, parse_schedule_to_intervals
-from ocr.parser import generate_clock_image
+from utils.helpers import format_all_periods
+from utils.slots import slot_of
+from ocr.parser import generate_clock_image, get_clock_layer_path, compose_clock_with_hand, get_clock_hand_hour
+from utils.cpu_pool import run_cpu
+from utils.file_ids import send_cached_photo, clock_file_key, image_file_key
 
 async def send_schedule_logic(chat_id, subqueue, day_type="today", is_update=False):
     """Send schedule logic for a specific chat and subqueue"""
@@ -14,28 +17,21 @@ async def send_schedule_logic(chat_id, subqueue, day_type="today", is_update=Fal
     date_str = target_dt.strftime("%d.%m.%Y")
 
     # Get schedule from cache
-    schedule_text = get_schedule_for_date(date_str, subqueue)
+    schedule = get_schedule_for_date(date_str, subqueue)
 
-    # If not in cache, try to get from site
-    if not schedule_text:
-        all_data = await parse_hoe_smart()
-        short_date = target_dt.strftime("%d.%m.%y")
-        data = all_data.get(date_str) or all_data.get(short_date)
+    # Site data comes from the shared snapshot, refreshed only by monitor_job
+    data = get_date_data(target_dt)
 
-        if data and data.get('schedules'):
-            schedule_text = normalize_schedule_text(data['schedules'].get(subqueue, ""))
-            # Save to cache
-            if schedule_text:
-                update_cached_schedule(date_str, subqueue, schedule_text, "full")
-
-    # Get site data for image
-    all_data = await parse_hoe_smart()
-    short_date = target_dt.strftime("%d.%m.%y")
-    data = all_data.get(date_str) or all_data.get(short_date)
+    # If not in cache, try the snapshot
+    if not schedule and data and data.get('schedules'):
+        schedule = data['schedules'].get(subqueue, schedule)
+        # Save to cache
+        if schedule:
+            update_cached_schedule(date_str, subqueue, schedule)
 
     img_url = data['img_url'] if data else None
 
-    if not schedule_text and not data:
+    if not schedule and not data:
         if day_type == "tomorrow":
             try:
                 await bot.send_message(chat_id, "🕠 <b>Графік на завтра ще не опубліковано.</b>\nЗазвичай він з'являється після <b>20:00</b>.", parse_mode="HTML")
@@ -51,22 +47,20 @@ async def send_schedule_logic(chat_id, subqueue, day_type="today", is_update=Fal
     if is_update:
         try:
             if img_url:
-                await bot.send_photo(chat_id, photo=img_url, caption=f"🆕 <b>ОНОВЛЕННЯ НА САЙТІ!</b>\nГрафік на {date_str} вже доступний.", parse_mode="HTML")
+                await send_cached_photo(chat_id, image_file_key(img_url), lambda: img_url,
+                                        caption=f"🆕 <b>ОНОВЛЕННЯ НА САЙТІ!</b>\nГрафік на {date_str} вже доступний.", parse_mode="HTML")
             else:
                 await bot.send_message(chat_id, f"🆕 <b>ОНОВЛЕННЯ НА САЙТІ!</b>\nГрафік на {date_str} вже доступний.", parse_mode="HTML")
-            if not schedule_text:
+            if not schedule:
                 await bot.send_message(chat_id, "📝 <b>Зверніть увагу:</b> Детальні списки годин відключень будуть розписані трохи пізніше (зазвичай протягом години).", parse_mode="HTML")
         except Exception as e:
             logging.error(f"Failed to send update to {chat_id}: {e}")
         return
 
     # Form message
-    intervals = parse_schedule_to_intervals(schedule_text)
-
     if day_type == "today":
         # Check light status only for guaranteed outages
-        guaranteed_text = "; ".join([f"{start:02d}:00-{end:02d}:00" for start, end in intervals['guaranteed']])
-        light_now = check_light_status(guaranteed_text)
+        light_now = not schedule.guaranteed >> slot_of(datetime.now()) & 1
         status = "🟢 Електропостачання увімкнене" if light_now else "🔴 Електропостачання вимкнене"
         msg = f"<b>{status}</b>\n━━━━━━━━━━━━━━━\n"
     else:
@@ -75,7 +69,7 @@ async def send_schedule_logic(chat_id, subqueue, day_type="today", is_update=Fal
     msg += f"📅 <b>Графік на {date_str}</b>\n📍 Підчерга: <b>{subqueue}</b>\n\n"
 
     # Format all periods in one block
-    formatted_periods = format_all_periods(intervals)
+    formatted_periods = format_all_periods(schedule)
 
     if formatted_periods:
         msg += f"⚡ <b>ВІДКЛЮЧЕННЯ:</b>\n"
@@ -89,26 +83,27 @@ async def send_schedule_logic(chat_id, subqueue, day_type="today", is_update=Fal
 
     msg += "\n━━━━━━━━━━━━━━━"
 
-    # Generate clock with combined text
-    # Check if clock already exists
+    # Clock = cached schedule layer + time hand composited right now
     date_formatted = date_str.replace('.', '_')
-    clock_filename = f"clocks/{subqueue}_{date_formatted}.png"
-    
-    if not os.path.exists(clock_filename):
-        # Generate clock if it doesn't exist
-        clock_file = generate_clock_image(subqueue, schedule_text, date_formatted)
-    else:
-        # Use existing clock
-        clock_file = clock_filename
+    hand_hour = get_clock_hand_hour()
+
+    async def make_clock():
+        clock_layer = get_clock_layer_path(subqueue, schedule, date_formatted)
+        if not os.path.exists(clock_layer):
+            # Generate schedule layer if it doesn't exist (in the CPU pool, off the event loop)
+            clock_layer = await run_cpu(generate_clock_image, subqueue, schedule, date_formatted)
+        clock_png = await run_cpu(compose_clock_with_hand, clock_layer, hand_hour)
+        return types.BufferedInputFile(clock_png, filename=f"clock_{subqueue}_{date_formatted}.png")
 
     try:
-        await bot.send_photo(chat_id, photo=types.FSInputFile(clock_file), caption=msg, parse_mode="HTML")
+        # Same schedule + same hour = same picture, so Telegram's file_id is reused after the first upload
+        await send_cached_photo(chat_id, clock_file_key(schedule, hand_hour), make_clock, caption=msg, parse_mode="HTML")
     except Exception as e:
         logging.error(f"Failed to send clock to {chat_id}: {e}")
         # Fallback to site image or just text
         if img_url:
             try:
-                await bot.send_photo(chat_id, photo=img_url, caption=msg, parse_mode="HTML")
+                await send_cached_photo(chat_id, image_file_key(img_url), lambda: img_url, caption=msg, parse_mode="HTML")
             except Exception as e:
                 logging.error(f"Failed to send schedule to {chat_id}: {e}")
                 try:
@@ -0,0 +1,118 @@
+import re
+from collections import namedtuple
+
+# Half-hour resolution: bit i of a mask is the slot starting at i * 30 minutes
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+# Slot states, in order of severity (guaranteed outage wins over possible)
+SLOT_ON = 0
+SLOT_POSSIBLE = 1
+SLOT_OFF = 2
+
+class DaySchedule(namedtuple('DaySchedule', ['guaranteed', 'possible'])):
+    """
+    Outages of one subqueue for one day as two 48-bit masks.
+    The masks never overlap; a schedule without outages is falsy.
+    Serializes to JSON as [guaranteed, possible].
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.guaranteed or self.possible)
+
+EMPTY_SCHEDULE = DaySchedule(0, 0)
+
+def make_schedule(guaranteed=0, possible=0):
+    """DaySchedule from raw masks; a slot that is both guaranteed and possible counts as guaranteed"""
+    guaranteed &= FULL_DAY
+    return DaySchedule(guaranteed, possible & FULL_DAY & ~guaranteed)
+
+def slot_range(start, end):
+    """Mask with slots start <= i < end set"""
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+def iter_ranges(mask):
+    """Runs of set bits as (start_slot, end_slot), in order"""
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        # Number of trailing ones
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        yield start, start + length
+        mask &= ~(((1 << length) - 1) << start)
+
+def iter_slots(mask):
+    """Indexes of set bits, in order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def slot_of(moment):
+    """Slot of a datetime/time within its day"""
+    return (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+
+def slot_state(schedule, slot):
+    """SLOT_ON / SLOT_POSSIBLE / SLOT_OFF of one slot"""
+    if schedule.guaranteed >> slot & 1:
+        return SLOT_OFF
+    if schedule.possible >> slot & 1:
+        return SLOT_POSSIBLE
+    return SLOT_ON
+
+def slot_label(slot):
+    """Slot boundary as HH:MM (48 -> 24:00)"""
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def format_ranges(mask):
+    """Mask as '07:00-09:30, 14:00-15:00'"""
+    return ", ".join(f"{slot_label(start)}-{slot_label(end)}" for start, end in iter_ranges(mask))
+
+def schedule_to_text(schedule):
+    """Canonical text 'guaranteed ranges; possible ranges' (the possible part only if present)"""
+    text = format_ranges(schedule.guaranteed)
+    if schedule.possible:
+        text += "; " + format_ranges(schedule.possible)
+    return text
+
+_RANGE_RE = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+
+def _parse_ranges(text):
+    mask = 0
+    for h1, m1, h2, m2 in _RANGE_RE.findall(text):
+        start = (int(h1) * 60 + int(m1)) // SLOT_MINUTES
+        end = -(-(int(h2) * 60 + int(m2)) // SLOT_MINUTES)
+        # An interval running past midnight is cut at the end of the day
+        if end <= start:
+            end = SLOTS_PER_DAY
+        mask |= slot_range(min(start, SLOTS_PER_DAY), min(end, SLOTS_PER_DAY))
+    return mask
+
+def parse_schedule_text(text):
+    """
+    DaySchedule from schedule text: the canonical form, site text ('з 07:00 до 09:00')
+    or the old OCR text ('Вимкнено: ...; Можливо вимкнено: ...').
+    """
+    if not text:
+        return EMPTY_SCHEDULE
+    text = re.sub(r'[–\—\−]', '-', text)
+    text = re.sub(r'\s+до\s+', '-', text)
+    if "Можливо вимкнено:" in text:
+        head, possible_text = text.split("Можливо вимкнено:", 1)
+        guaranteed_text = head.split("Вимкнено:", 1)[1] if "Вимкнено:" in head else ""
+    elif "Вимкнено:" in text:
+        guaranteed_text, possible_text = text.split("Вимкнено:", 1)[1], ""
+    else:
+        guaranteed_text, _, possible_text = text.partition(';')
+    return make_schedule(_parse_ranges(guaranteed_text), _parse_ranges(possible_text))
+
+def as_schedule(value):
+    """DaySchedule from its JSON form [guaranteed, possible] or from legacy schedule text"""
+    if isinstance(value, str):
+        return parse_schedule_text(value)
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return make_schedule(int(value[0]), int(value[1]))
+    return EMPTY_SCHEDULE
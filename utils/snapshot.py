@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from datetime import datetime
+
+# Latest parse_hoe_smart() result shared by the whole process.
+# Handlers only read from here; monitor_job (via check_and_update_cache) refreshes it.
+_snapshot = {
+    'data': {},          # date_key -> {'img_url', 'schedules' ({subqueue: DaySchedule}), 'ocr_schedules', 'uncertain', 'text_content'}
+    'updated_at': None,  # when data was last successfully refreshed
+    'checked_at': None,  # when the site was last checked (successfully or not)
+}
+
+_refresh_task = None
+
+def get_snapshot():
+    """Get the current snapshot dict (data + freshness timestamps)"""
+    return _snapshot
+
+def get_snapshot_data():
+    """Get parsed site data from the snapshot without touching the network"""
+    return _snapshot['data']
+
+def get_date_data(target_dt):
+    """Get snapshot data for a date, accepting both DD.MM.YYYY and DD.MM.YY keys"""
+    data = _snapshot['data']
+    return data.get(target_dt.strftime("%d.%m.%Y")) or data.get(target_dt.strftime("%d.%m.%y"))
+
+def _stabilize_data(all_data):
+    """Replace raw OCR readings with what the stability filter lets through"""
+    from ocr.stability import prune_pending, stabilize
+    from utils.cache import get_date_schedules
+
+    prune_pending(all_data.keys())
+    stable = {}
+    for date_key, data in all_data.items():
+        data = dict(data)
+        if 'ocr_schedules' in data:
+            data['schedules'] = stabilize(date_key, data['ocr_schedules'], data.get('uncertain', {}),
+                                          get_date_schedules(date_key))
+        stable[date_key] = data
+    return stable
+
+async def _do_refresh():
+    from utils.monitoring import parse_hoe_smart
+    from ocr.stability import has_pending_changes
+
+    # Conditional fetch once we have something to fall back on
+    all_data = await parse_hoe_smart(previous=_snapshot['data'] or None)
+    if all_data is None and has_pending_changes():
+        # Page not modified, but uncertain changes wait for confirmation: this poll is one more read
+        logging.info("Site page not modified, re-checking pending OCR changes")
+        all_data = _snapshot['data']
+    if all_data:
+        all_data = _stabilize_data(all_data)
+    _snapshot['checked_at'] = datetime.now()
+    if all_data is None:
+        # Site not modified - snapshot is still current
+        _snapshot['updated_at'] = _snapshot['checked_at']
+    elif all_data:
+        _snapshot['data'] = all_data
+        _snapshot['updated_at'] = _snapshot['checked_at']
+        logging.info(f"Schedule snapshot refreshed: {len(all_data)} dates")
+    else:
+        logging.warning("Schedule snapshot refresh returned no data, keeping previous snapshot")
+    return all_data
+
+async def refresh_snapshot():
+    """
+    Re-scrape the site and replace the snapshot.
+    Concurrent callers join the refresh already in flight instead of starting their own.
+    Returns the freshly parsed data ({} on failure, None if the site has not changed).
+    """
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_do_refresh())
+    # Shield so a cancelled caller doesn't cancel the refresh for everyone else
+    return await asyncio.shield(_refresh_task)
@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime, timedelta
+from utils.slots import FULL_DAY, SLOT_MINUTES, SLOTS_PER_DAY, iter_slots, make_schedule, slot_state
+
+# Power states, in order of severity (indexed by utils.slots SLOT_ON / SLOT_POSSIBLE / SLOT_OFF)
+STATE_WHITE = 'white'  # power on
+STATE_GREY = 'grey'  # possible outage
+STATE_BLACK = 'black'  # guaranteed outage
+_SEVERITY = [STATE_WHITE, STATE_GREY, STATE_BLACK]
+
+# subqueue -> [(ts, from_state, to_state), ...] sorted by ts.
+# Spans all known dates of the subqueue, so transitions at midnight are included.
+# Rebuilt as a whole from the schedule store.
+_timeline = {}
+
+def parse_date_key(date_key):
+    """Midnight of a DD.MM.YYYY (or DD.MM.YY) date key, None if it is not a date"""
+    for fmt in ("%d.%m.%Y", "%d.%m.%y"):
+        try:
+            return datetime.strptime(date_key, fmt)
+        except ValueError:
+            continue
+    return None
+
+def build_transitions(day_schedules):
+    """
+    Sorted [(ts, from_state, to_state), ...] for {day_start: DaySchedule} of one subqueue.
+    Before the first known day power is assumed on; after the last known day nothing is assumed.
+    """
+    transitions = []
+    previous_day = None
+    # Bits of the last slot of the previous day
+    carry_guaranteed = carry_possible = 0
+    for day_start in sorted(day_schedules):
+        if previous_day is None or day_start - previous_day != timedelta(days=1):
+            # First day or gap between known days: start over as if power was on
+            carry_guaranteed = carry_possible = 0
+        schedule = day_schedules[day_start]
+        guaranteed, possible = schedule
+
+        # Bit i is set where slot i differs from slot i - 1
+        changed = ((guaranteed ^ ((guaranteed << 1 | carry_guaranteed) & FULL_DAY))
+                   | (possible ^ ((possible << 1 | carry_possible) & FULL_DAY)))
+        for slot in iter_slots(changed):
+            if slot:
+                previous_state = slot_state(schedule, slot - 1)
+            else:
+                previous_state = slot_state(make_schedule(carry_guaranteed, carry_possible), 0)
+            transitions.append((day_start + timedelta(minutes=slot * SLOT_MINUTES),
+                                _SEVERITY[previous_state], _SEVERITY[slot_state(schedule, slot)]))
+
+        carry_guaranteed = guaranteed >> (SLOTS_PER_DAY - 1) & 1
+        carry_possible = possible >> (SLOTS_PER_DAY - 1) & 1
+        previous_day = day_start
+    return transitions
+
+def rebuild_timeline(store):
+    """Rebuild the timeline from the schedule store (ScheduleKey(date, subqueue) -> DaySchedule)"""
+    global _timeline
+    by_subqueue = {}
+    for (date_key, subqueue), schedule in store.items():
+        day_start = parse_date_key(date_key)
+        if day_start is None:
+            continue
+        by_subqueue.setdefault(subqueue, {})[day_start] = schedule
+
+    timeline = {subqueue: build_transitions(day_schedules) for subqueue, day_schedules in by_subqueue.items()}
+    _timeline = timeline
+    logging.debug(f"Timeline rebuilt for {len(timeline)} subqueues")
+
+def get_all_transitions():
+    """{subqueue: [(ts, from_state, to_state), ...]} for all known dates"""
+    return {subqueue: list(transitions) for subqueue, transitions in _timeline.items()}